@@ -1,135 +1,372 @@
+import time
+import_start = time.perf_counter()
+
+import os
+import multiprocessing
 import pandas as pd
-import re
+import numpy as np
 from datetime import datetime
-import nltk
-from nltk.corpus import stopwords
 from collections import Counter
+from text_normalization import (clean_text_series, get_stop_words, cleaning_fingerprint,
+                                STOP_WORDS_FILE)
+from near_duplicates import NearDuplicateIndex
+from cleaned_text_cache import CleanedTextCache
+from trend_sketches import TrendTracker
+from engagement_cube import EngagementCube, query_cube
+from output_formats import TableWriter
+from dataset_schemas import read_dataset, SCHEMAS
+from digest_set import DigestSet
 
-# Download required NLTK data if not already downloaded
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt', quiet=True)
+import_seconds = time.perf_counter() - import_start
 
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords', quiet=True)
+# Processing options
+# CHUNK_SIZE = None loads the whole file at once. Set it to a row count
+# (e.g. 500_000) to stream large exports chunk by chunk with bounded memory;
+# the output file is identical either way.
+CHUNK_SIZE = None
+# WORKERS > 1 cleans post text in a pool of that many processes
+WORKERS = 1
+# NEAR_DUPLICATE_THRESHOLD = None only removes exact duplicates. Set a Jaccard
+# similarity (e.g. 0.8) to also remove reposts that differ by a word or a
+# hashtag; the duplicate clusters are written to near_duplicates_file.
+NEAR_DUPLICATE_THRESHOLD = None
+# CACHE_FILE = None cleans every post on every run. Set it to a SQLite file
+# (e.g. 'social_media_cleaned_cache.sqlite') to keep cleaned text between runs
+# and only clean new or edited posts; the cache is trimmed to CACHE_MAX_ENTRIES.
+CACHE_FILE = None
+CACHE_MAX_ENTRIES = 10_000_000
+# OUTPUT_FORMAT: 'csv' (default), 'parquet' or 'feather' (Arrow IPC); the
+# columnar formats keep categories, compact integers and native timestamps
+OUTPUT_FORMAT = 'csv'
+# Trending hashtags and terms per hour and weekday: TRENDS_TOP_K items per
+# bucket are written to trends_file (None disables the trends report)
+TRENDS_TOP_K = None
+input_file = 'social_media.csv'
+output_file = 'social_media_preprocessed.csv'
+near_duplicates_file = 'social_media_near_duplicates.csv'
+trends_file = 'social_media_trends.csv'
+# Pre-aggregated likes/shares cube by user x hour x weekday for dashboards,
+# queried with engagement_cube.query_cube (e.g. 'social_media_engagement_cube.sqlite';
+# None disables the cube)
+cube_file = None
 
-# Load the dataset
-print("Loading dataset...")
-df = pd.read_csv('social_media.csv')
+# Workers of a spawn-only platform would re-run this unguarded script
+if WORKERS > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+    raise ValueError("WORKERS > 1 needs the fork start method, which this platform lacks; "
+                     "set WORKERS = 1")
 
-print(f"Original dataset shape: {df.shape}")
-print(f"Original columns: {df.columns.tolist()}\n")
+def mark_duplicates(cleaned_text, seen_digests):
+    """
+    Flag posts whose cleaned text has already been seen, in this chunk or any
+    earlier one. Only a 64-bit digest of each distinct cleaned text is kept in
+    seen_digests (a DigestSet, 8 bytes per unique post), so memory grows with
+    the number of unique posts rather than with the size of their text.
+    """
+    digests = pd.util.hash_pandas_object(cleaned_text, index=False).to_numpy()
+    return pd.Series(seen_digests.add(digests), index=cleaned_text.index)
 
-# Function to clean text: remove stopwords, punctuation, and special symbols
-def clean_text(text):
+def scan_timestamps(path, chunksize):
     """
-    Clean text by removing HTML tags, special symbols, punctuation, and stopwords.
+    Return (any timestamp missing or unparseable, every timestamp at
+    midnight) for the whole file. A single-shot run then writes the hour
+    column as float (20.0), or the timestamps without a time of day, so
+    chunked runs write every chunk the same way. Only the timestamp column is
+    read, chunk by chunk.
     """
-    if pd.isna(text):
-        return ""
-    
-    # Convert to string
-    text = str(text)
-    
-    # Remove HTML tags
-    text = re.sub(r'<[^>]+>', '', text)
-    
-    # Remove URLs
-    text = re.sub(r'http\S+|www.\S+', '', text)
-    
-    # Remove special characters and punctuation, keep only alphanumeric and spaces
-    text = re.sub(r'[^a-zA-Z0-9\s]', '', text)
-    
-    # Convert to lowercase
-    text = text.lower()
-    
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    # Remove stopwords
-    stop_words = set(stopwords.words('english'))
-    words = text.split()
-    cleaned_words = [word for word in words if word not in stop_words and len(word) > 1]
-    
-    return ' '.join(cleaned_words)
-
-# Clean the post_text column
-print("Cleaning post text (removing stopwords, punctuation, special symbols)...")
-df['cleaned_text'] = df['post_text'].apply(clean_text)
-
-# Handle missing values in likes and shares columns
-print("Handling missing values in likes and shares columns...")
-# Count missing values before conversion
-likes_missing = df['likes'].isna().sum() + (df['likes'] == '').sum()
-shares_missing = df['shares'].isna().sum() + (df['shares'] == '').sum()
-
-# Fill missing values with 0 (assuming missing means no likes/shares)
-df['likes'] = pd.to_numeric(df['likes'], errors='coerce').fillna(0).astype(int)
-df['shares'] = pd.to_numeric(df['shares'], errors='coerce').fillna(0).astype(int)
-
-# Convert timestamp to datetime and extract features
-print("Converting timestamp to datetime and extracting features...")
-df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-df['hour'] = df['timestamp'].dt.hour
-df['weekday'] = df['timestamp'].dt.day_name()
-
-# Detect and remove duplicate posts
-print("Detecting duplicate posts...")
-# Consider posts with identical cleaned text as duplicates
-duplicate_mask = df.duplicated(subset=['cleaned_text'], keep='first')
-duplicate_count = duplicate_mask.sum()
-print(f"Found {duplicate_count} duplicate posts based on cleaned text")
+    date_format = SCHEMAS['social_media']['timestamps']['timestamp']
+    unparsed, dates_only = False, True
+    for chunk in pd.read_csv(path, usecols=['timestamp'], chunksize=chunksize):
+        parsed = pd.to_datetime(chunk['timestamp'], format=date_format, errors='coerce')
+        unparsed = unparsed or parsed.isna().any()
+        parsed = parsed.dropna()
+        dates_only = dates_only and (parsed == parsed.dt.normalize()).all()
+    return unparsed, dates_only
 
-# Remove duplicates, keeping the first occurrence
-df_cleaned = df[~duplicate_mask].copy()
+def merge_stats(stats, values):
+    """
+    Fold a chunk of values into running (count, mean, M2, min, max) statistics
+    using Chan's parallel update, so describe()-style numbers can be reported
+    without keeping the whole column in memory.
+    """
+    n_b = len(values)
+    if n_b == 0:
+        return stats
+    mean_b = values.mean()
+    m2_b = ((values - mean_b) ** 2).sum()
+    n_a, mean_a, m2_a, min_a, max_a = stats
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    return (n,
+            mean_a + delta * n_b / n,
+            m2_a + m2_b + delta ** 2 * n_a * n_b / n,
+            min(min_a, values.min()),
+            max(max_a, values.max()))
 
-# Detect spam posts (optional: posts with very short cleaned text or repeated patterns)
-print("Detecting spam posts...")
-# Consider posts with cleaned text length < 3 characters as potential spam
-spam_mask = df_cleaned['cleaned_text'].str.len() < 3
-spam_count = spam_mask.sum()
-print(f"Found {spam_count} potential spam posts (very short cleaned text)")
+def describe_stats(stats):
+    """Render running statistics in the same layout as Series.describe()."""
+    n, mean, m2, min_value, max_value = stats
+    std = (m2 / (n - 1)) ** 0.5 if n > 1 else float('nan')
+    return pd.Series([n, mean, std, min_value, max_value],
+                     index=['count', 'mean', 'std', 'min', 'max'], dtype=float)
+
+# Load the stopword list up front so startup cost is reported on its own
+stop_words_source = 'bundled file' if os.path.exists(STOP_WORDS_FILE) else 'NLTK corpus'
+init_start = time.perf_counter()
+stop_words = get_stop_words()
+init_seconds = time.perf_counter() - init_start
+print(f"Startup: imports {import_seconds * 1000:.0f} ms, "
+      f"stopword init {init_seconds * 1000:.1f} ms ({len(stop_words)} words from {stop_words_source})")
+
+# Load the dataset
+print("Loading dataset...")
+if CHUNK_SIZE:
+    print(f"Streaming mode: processing {CHUNK_SIZE} rows per chunk")
+    chunks = read_dataset(input_file, 'social_media', chunksize=CHUNK_SIZE)
+    # A chunk only knows its own timestamps; CSV output needs the whole file's
+    hour_as_float, dates_only = (scan_timestamps(input_file, CHUNK_SIZE)
+                                 if OUTPUT_FORMAT == 'csv' else (False, False))
+    csv_options = {'date_format': '%Y-%m-%d' if dates_only else '%Y-%m-%d %H:%M:%S'}
+else:
+    chunks = [read_dataset(input_file, 'social_media')]
+    # pandas picks the timestamp format for the whole file
+    csv_options = {}
+
+# Output writer shared by all chunks
+output_writer = TableWriter(output_file, OUTPUT_FORMAT,
+                            dtypes={'post_id': 'Int64', 'user': 'category', 'weekday': 'category',
+                                    'likes': 'int32', 'shares': 'int32', 'hour': 'Int8'},
+                            **csv_options)
+output_file = output_writer.path
+
+# Running totals across chunks
+total_posts = 0
+likes_missing = 0
+shares_missing = 0
+likes_unparsed = 0
+shares_unparsed = 0
+duplicate_count = 0
+spam_count = 0
+near_duplicate_count = 0
+kept_posts = 0
+seen_digests = DigestSet()
+if CACHE_FILE:
+    text_cache = CleanedTextCache(CACHE_FILE, max_entries=CACHE_MAX_ENTRIES,
+                                  fingerprint=cleaning_fingerprint())
+if cube_file:
+    engagement = EngagementCube()
+if TRENDS_TOP_K:
+    trends = TrendTracker(capacity=50 * TRENDS_TOP_K)
+if NEAR_DUPLICATE_THRESHOLD:
+    near_duplicate_index = NearDuplicateIndex(threshold=NEAR_DUPLICATE_THRESHOLD)
+    near_duplicate_clusters = Counter()
+sample_frames = []
+sample_size = 0
+kept_frames = []
+likes_stats = (0, 0.0, 0.0, float('inf'), float('-inf'))
+shares_stats = (0, 0.0, 0.0, float('inf'), float('-inf'))
+weekday_counts = Counter()
+hour_counts = Counter()
+
+for chunk_number, df in enumerate(chunks):
+    if chunk_number == 0:
+        input_columns = df.columns.tolist()
+        print(f"Original columns: {input_columns}\n")
+    total_posts += len(df)
+    # Nullable integer ids, so a chunk with a missing post_id still writes
+    # its ids as 3 rather than 3.0
+    df['post_id'] = df['post_id'].astype('Int64')
+
+    # Clean the post_text column
+    if chunk_number == 0:
+        print("Cleaning post text (removing stopwords, punctuation, special symbols)...")
+    if CACHE_FILE:
+        # Reuse cached results and clean only new or edited posts
+        df['cleaned_text'] = text_cache.lookup(df['post_id'], df['post_text'])
+        misses = df['cleaned_text'].isna()
+        if misses.any():
+            fresh = clean_text_series(df.loc[misses, 'post_text'], workers=WORKERS)
+            df.loc[misses, 'cleaned_text'] = fresh
+            text_cache.store(df.loc[misses, 'post_id'], df.loc[misses, 'post_text'], fresh)
+    else:
+        df['cleaned_text'] = clean_text_series(df['post_text'], workers=WORKERS)
+
+    # Handle missing values in likes and shares columns
+    if chunk_number == 0:
+        print("Handling missing values in likes and shares columns...")
+    # Count missing values before filling. The schema read leaves malformed
+    # values as NaN too; those are counted apart so 'missing' stays empty cells
+    unparsed = df.attrs.get('unparsed', {})
+    likes_unparsed += unparsed.get('likes', 0)
+    shares_unparsed += unparsed.get('shares', 0)
+    likes_missing += df['likes'].isna().sum() - unparsed.get('likes', 0)
+    shares_missing += df['shares'].isna().sum() - unparsed.get('shares', 0)
+
+    # Fill missing values with 0 (assuming missing means no likes/shares)
+    df['likes'] = df['likes'].fillna(0).astype(int)
+    df['shares'] = df['shares'].fillna(0).astype(int)
+
+    # Extract features from the timestamp (already parsed by the schema)
+    if chunk_number == 0:
+        print("Extracting timestamp features...")
+    df['hour'] = df['timestamp'].dt.hour
+    if CHUNK_SIZE and hour_as_float:
+        # Format the hour as the single-shot run does when some timestamp in
+        # the file is unparseable, even in chunks without one
+        df['hour'] = df['hour'].astype(float)
+    df['weekday'] = df['timestamp'].dt.day_name()
 
-# Remove spam posts
-df_cleaned = df_cleaned[~spam_mask].copy()
+    # Detect and remove duplicate posts
+    if chunk_number == 0:
+        print("Detecting duplicate posts...")
+    # Consider posts with identical cleaned text as duplicates; the digest set
+    # carries over between chunks so the first occurrence overall is kept
+    duplicate_mask = mark_duplicates(df['cleaned_text'], seen_digests)
+    duplicate_count += duplicate_mask.sum()
+
+    # Remove duplicates, keeping the first occurrence
+    df_cleaned = df[~duplicate_mask].copy()
+
+    # Detect near-duplicate posts with MinHash/LSH (optional)
+    if NEAR_DUPLICATE_THRESHOLD:
+        if chunk_number == 0:
+            print(f"Detecting near-duplicate posts (Jaccard >= {NEAR_DUPLICATE_THRESHOLD})...")
+        matches = near_duplicate_index.add(df_cleaned['cleaned_text'], df_cleaned['post_id'])
+        near_duplicate_mask = matches['duplicate_of'].notna()
+        near_duplicate_count += near_duplicate_mask.sum()
+        near_duplicate_clusters.update(matches.loc[near_duplicate_mask, 'duplicate_of'])
+
+        # Record which kept post each removed near-duplicate belongs to
+        report = df_cleaned.loc[near_duplicate_mask, ['post_id', 'cleaned_text']].join(matches)
+        report.to_csv(near_duplicates_file, index=False, header=(chunk_number == 0),
+                      mode='w' if chunk_number == 0 else 'a')
+        df_cleaned = df_cleaned[~near_duplicate_mask].copy()
+
+    # Detect spam posts (optional: posts with very short cleaned text or repeated patterns)
+    if chunk_number == 0:
+        print("Detecting spam posts...")
+    # Consider posts with cleaned text length < 3 characters as potential spam
+    spam_mask = df_cleaned['cleaned_text'].str.len() < 3
+    spam_count += spam_mask.sum()
+
+    # Remove spam posts
+    df_cleaned = df_cleaned[~spam_mask].copy()
+    kept_posts += len(df_cleaned)
+
+    # Save preprocessed chunk, writing the header only once
+    output_writer.write(df_cleaned)
+
+    # Feed hashtag and term counts for this chunk into the trend sketches
+    if TRENDS_TOP_K:
+        trends.update(df_cleaned)
+
+    # Fold likes and shares into the engagement cube
+    if cube_file:
+        engagement.update(df_cleaned)
+
+    # Keep just enough rows for the sample printout
+    if sample_size < 5:
+        sample_frames.append(df_cleaned.head(5 - sample_size))
+        sample_size += len(sample_frames[-1])
+
+    # Statistics: keep the full frame in single-shot mode, running totals otherwise
+    if CHUNK_SIZE:
+        likes_stats = merge_stats(likes_stats, df_cleaned['likes'])
+        shares_stats = merge_stats(shares_stats, df_cleaned['shares'])
+        weekday_counts.update(df_cleaned['weekday'].dropna())
+        hour_counts.update(df_cleaned['hour'].dropna())
+    else:
+        kept_frames.append(df_cleaned)
+
+if CACHE_FILE:
+    cache_size = text_cache.evict()
+    text_cache.close()
+
+print(f"Original dataset shape: {(total_posts, len(input_columns))}")
+print(f"Found {duplicate_count} duplicate posts based on cleaned text")
+if NEAR_DUPLICATE_THRESHOLD:
+    print(f"Found {near_duplicate_count} near-duplicate posts in {len(near_duplicate_clusters)} clusters")
+print(f"Found {spam_count} potential spam posts (very short cleaned text)")
 
 # Display summary
 print("\n" + "="*60)
 print("CLEANING SUMMARY")
 print("="*60)
-print(f"Original dataset: {df.shape[0]} posts")
-print(f"After removing duplicates: {df_cleaned.shape[0]} posts")
-print(f"Removed: {df.shape[0] - df_cleaned.shape[0]} posts")
+print(f"Original dataset: {total_posts} posts")
+print(f"After removing duplicates: {kept_posts} posts")
+print(f"Removed: {total_posts - kept_posts} posts")
 print("\nMissing values handled:")
 print(f"  - Likes: {likes_missing} missing values filled with 0")
 print(f"  - Shares: {shares_missing} missing values filled with 0")
+if likes_unparsed or shares_unparsed:
+    print(f"  - Unparseable values filled with 0: {likes_unparsed} likes, {shares_unparsed} shares")
+
+if CACHE_FILE:
+    print("\nCleaned-text cache:")
+    print(f"  - Hits: {text_cache.hits} (reused), misses: {text_cache.misses} (cleaned)")
+    print(f"  - Entries: {cache_size} of {CACHE_MAX_ENTRIES}, evicted this run: {text_cache.evicted}")
+
+if NEAR_DUPLICATE_THRESHOLD:
+    print("\nLargest near-duplicate clusters (kept post_id: posts removed):")
+    for post_id, size in near_duplicate_clusters.most_common(5):
+        print(f"  {post_id}: {size}")
+    print(f"Near-duplicate report saved to: {near_duplicates_file}")
+
+output_writer.close()
+
+# Save trending hashtags and terms
+if TRENDS_TOP_K:
+    trends_report = trends.report(TRENDS_TOP_K)
+    trends_report.to_csv(trends_file, index=False)
+    print("\nTop hashtags overall (by weekday buckets):")
+    top_hashtags = (trends_report[(trends_report['dimension'] == 'weekday') &
+                                  (trends_report['kind'] == 'hashtag')]
+                    .groupby('item')['count'].sum().nlargest(5))
+    for hashtag, count in top_hashtags.items():
+        print(f"  #{hashtag}: {count}")
+    print(f"Trends report saved to: {trends_file}")
+
+# Save the engagement cube and show an overall lookup from it
+if cube_file:
+    engagement.save(cube_file)
+    print("\nEngagement overview (from cube):")
+    overview = query_cube(cube_file)
+    print(f"  - Posts: {overview['posts']}, likes mean={overview['likes_mean']:.2f} "
+          f"p90={overview['likes_p90']:.1f}, shares mean={overview['shares_mean']:.2f} "
+          f"p90={overview['shares_p90']:.1f}")
+    print(f"Engagement cube saved to: {cube_file}")
 
 # Display sample of cleaned data
 print("\n" + "="*60)
 print("SAMPLE OF CLEANED DATA")
 print("="*60)
 print("\nFirst 5 rows of cleaned dataset:")
-print(df_cleaned[['post_id', 'user', 'post_text', 'cleaned_text', 'likes', 'shares', 
-                  'timestamp', 'hour', 'weekday']].head().to_string(index=False))
+df_sample = pd.concat(sample_frames)
+print(df_sample[['post_id', 'user', 'post_text', 'cleaned_text', 'likes', 'shares',
+                 'timestamp', 'hour', 'weekday']].to_string(index=False))
 
-# Save preprocessed dataset
-output_file = 'social_media_preprocessed.csv'
-df_cleaned.to_csv(output_file, index=False)
 print(f"\nPreprocessed dataset saved to: {output_file}")
 
 # Display statistics
 print("\n" + "="*60)
 print("DATASET STATISTICS")
 print("="*60)
-print(f"\nTotal posts after cleaning: {len(df_cleaned)}")
-print(f"\nLikes statistics:")
-print(df_cleaned['likes'].describe())
-print(f"\nShares statistics:")
-print(df_cleaned['shares'].describe())
-print(f"\nPosts by weekday:")
-print(df_cleaned['weekday'].value_counts().sort_index())
-print(f"\nPosts by hour:")
-print(df_cleaned['hour'].value_counts().sort_index())
+print(f"\nTotal posts after cleaning: {kept_posts}")
+if CHUNK_SIZE:
+    print(f"\nLikes statistics:")
+    print(describe_stats(likes_stats))
+    print(f"\nShares statistics:")
+    print(describe_stats(shares_stats))
+    print(f"\nPosts by weekday:")
+    print(pd.Series(weekday_counts, dtype=int).sort_index())
+    print(f"\nPosts by hour:")
+    print(pd.Series(hour_counts, dtype=int).sort_index())
+else:
+    df_cleaned = kept_frames[0]
+    print(f"\nLikes statistics:")
+    print(df_cleaned['likes'].describe())
+    print(f"\nShares statistics:")
+    print(df_cleaned['shares'].describe())
+    print(f"\nPosts by weekday:")
+    print(df_cleaned['weekday'].value_counts().sort_index())
+    print(f"\nPosts by hour:")
+    print(df_cleaned['hour'].value_counts().sort_index())
@@ -1,19 +1,100 @@
+import os
+import sys
+import multiprocessing
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from output_formats import write_table
+from dataset_schemas import read_dataset
+from technical_indicators import compute_indicators
+from financial_features import (sort_series, fill_prices, fill_volume, add_lag_returns,
+                                iqr_bounds, flag_outliers, preprocess_partitioned,
+                                save_state, update_incremental, STATE_FILE,
+                                price_sketches, sketch_iqr_bounds)
+
+# Processing options
+# OUTPUT_FORMAT: 'csv' (default), 'parquet' or 'feather' (Arrow IPC); the
+# columnar formats keep categories, compact integers and native timestamps
+OUTPUT_FORMAT = 'csv'
+# TICKER_COLUMN: long-format files with this column hold many series; fills,
+# returns and outlier bounds are then computed per ticker. Without it the
+# file is one series.
+TICKER_COLUMN = 'ticker'
+# RETURN_HORIZONS: one return_{h}day percentage-return column per horizon
+RETURN_HORIZONS = [1, 7]
+# INDICATORS: technical indicators to add, as {name: [windows]} - e.g.
+# technical_indicators.DEFAULT_INDICATORS; None adds none. Not available in
+# incremental mode (STATE_DIR)
+INDICATORS = None
+# PARTITIONS: None processes the file in memory; a number N processes a
+# multi-ticker file larger than memory in two passes (CHUNK_SIZE rows at a
+# time, then N ticker-hash partitions one at a time), e.g. 100M rows with
+# N = 100 and CHUNK_SIZE = 1_000_000 keeps about 1M rows in memory
+PARTITIONS = None
+CHUNK_SIZE = 1_000_000
+# STATE_DIR: directory for incremental mode (CSV output only). The first run
+# is a full run that also saves bounded per-series state; later runs only
+# process rows appended to the input since then and append them to the
+# output. Each appended row matches a full recompute at the time it is
+# appended (medians and IQR quartiles come from KLL sketches with rank error
+# OUTLIER_RANK_ERROR, or 0.001, once a series outgrows them); rows written
+# earlier keep their values. Delete the directory to force a full recompute.
+STATE_DIR = None
+# OUTLIER_RANK_ERROR: None computes the IQR quartiles exactly; a value such as
+# 0.001 estimates them from mergeable KLL sketches with that rank error. With
+# PARTITIONS the output is then re-flagged in a streaming pass over chunks
+# (flag_outliers_streaming in financial_features)
+OUTLIER_RANK_ERROR = None
+# WORKERS: above 1, the OUTLIER_RANK_ERROR sketches are built on row shards
+# (or chunks, with PARTITIONS) in a pool of that many processes and merged
+# (exact quartiles ignore it)
+WORKERS = 1
+
+input_file = 'financial_data.csv'
+output_file = 'financial_data_preprocessed.csv'
+
+# Workers of a spawn-only platform would re-run this unguarded script
+if WORKERS > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+    raise ValueError("WORKERS > 1 needs the fork start method, which this platform lacks; "
+                     "set WORKERS = 1")
+
+if PARTITIONS:
+    print(f"Preprocessing {input_file} in {PARTITIONS} ticker partitions...")
+    rows, tickers, outlier_count, output_file = preprocess_partitioned(
+        input_file, output_file, TICKER_COLUMN, RETURN_HORIZONS, PARTITIONS,
+        CHUNK_SIZE, OUTPUT_FORMAT, INDICATORS, OUTLIER_RANK_ERROR, WORKERS)
+    print(f"Rows: {rows}, tickers: {tickers}, outliers flagged: {outlier_count}")
+    print(f"Preprocessed dataset saved to: {output_file}")
+    sys.exit(0)
+
+if STATE_DIR and INDICATORS:
+    raise ValueError("Incremental mode (STATE_DIR) does not support INDICATORS")
+if STATE_DIR and os.path.exists(os.path.join(STATE_DIR, STATE_FILE)):
+    if OUTPUT_FORMAT != 'csv':
+        raise ValueError("Incremental mode appends to a CSV output; set OUTPUT_FORMAT = 'csv'")
+    print(f"Processing rows appended to {input_file} since the last run...")
+    appended = update_incremental(input_file, output_file, STATE_DIR)
+    if appended is None:
+        print("No new rows.")
+    else:
+        print(f"Appended {len(appended)} rows ({appended['is_outlier'].sum()} outliers) "
+              f"to {output_file}")
+        print(appended.head(10).to_string(index=False))
+    sys.exit(0)
 
 # Load the dataset
 print("Loading financial dataset...")
-df = pd.read_csv('financial_data.csv')
+df = read_dataset(input_file, 'financial_data')
 
 print(f"Original dataset shape: {df.shape}")
 print(f"Original columns: {df.columns.tolist()}\n")
 
-# Convert date column to datetime
-df['date'] = pd.to_datetime(df['date'], errors='coerce')
+ticker = TICKER_COLUMN if TICKER_COLUMN in df.columns else None
+if ticker:
+    print(f"Tickers: {df[ticker].nunique()}\n")
 
-# Sort by date to ensure chronological order
-df = df.sort_values('date').reset_index(drop=True)
+# Sort by date (within each ticker) to ensure chronological order
+df = sort_series(df, ticker)
 
 # Display initial missing values
 print("="*60)
@@ -29,20 +110,17 @@ print("="*60)
 
 # For closing_price: forward fill, then backward fill (carry forward last known price)
 # This is common in financial data as prices are continuous
+# If still missing (first row), use mean; all of this is done per ticker
 closing_price_missing = df['closing_price'].isna().sum()
-df['closing_price'] = pd.to_numeric(df['closing_price'], errors='coerce')
-df['closing_price'] = df['closing_price'].ffill().bfill()
-
-# If still missing (first row), use mean
-if df['closing_price'].isna().any():
-    df['closing_price'] = df['closing_price'].fillna(df['closing_price'].mean())
+observed_price = df['closing_price'].notna().to_numpy()
+df = fill_prices(df, ticker)
 
 print(f"Closing price: {closing_price_missing} missing values handled (forward fill, backward fill, then mean)")
 
 # For volume: fill with median (less sensitive to outliers than mean)
 volume_missing = df['volume'].isna().sum()
-df['volume'] = pd.to_numeric(df['volume'], errors='coerce')
-df['volume'] = df['volume'].fillna(df['volume'].median())
+observed_volume = df['volume'].notna().to_numpy()
+df = fill_volume(df, ticker)
 
 print(f"Volume: {volume_missing} missing values handled (filled with median)")
 
@@ -56,19 +134,26 @@ print("="*60)
 print("CREATING LAG FEATURES")
 print("="*60)
 
-# Calculate 1-day return: (price_today - price_yesterday) / price_yesterday
-df['return_1day'] = df['closing_price'].pct_change(periods=1) * 100  # as percentage
-df['return_1day'] = df['return_1day'].fillna(0)  # First row will be NaN, fill with 0
-
-# Calculate 7-day return: (price_today - price_7days_ago) / price_7days_ago
-df['return_7day'] = df['closing_price'].pct_change(periods=7) * 100  # as percentage
-df['return_7day'] = df['return_7day'].fillna(0)  # First 7 rows will be NaN, fill with 0
+# h-day return: (price_today - price_h_days_ago) / price_h_days_ago, as a
+# percentage; the first h rows of each ticker have no base price and get 0
+df = add_lag_returns(df, RETURN_HORIZONS, ticker)
+return_columns = [f'return_{h}day' for h in RETURN_HORIZONS]
 
 print("Created lag features:")
-print(f"  - return_1day: 1-day percentage return")
-print(f"  - return_7day: 7-day percentage return")
+for h in RETURN_HORIZONS:
+    print(f"  - return_{h}day: {h}-day percentage return")
 print(f"\nSample returns:")
-print(df[['date', 'closing_price', 'return_1day', 'return_7day']].head(10).to_string(index=False))
+print(df[['date', 'closing_price'] + return_columns].head(10).to_string(index=False))
+
+if INDICATORS:
+    print("\n" + "="*60)
+    print("COMPUTING TECHNICAL INDICATORS")
+    print("="*60)
+    columns_before = set(df.columns)
+    df = compute_indicators(df, INDICATORS, ticker)
+    indicator_columns = [column for column in df.columns if column not in columns_before]
+    print(f"Created {len(indicator_columns)} indicator columns: {indicator_columns}")
+    print(df[indicator_columns].describe().T[['count', 'mean', 'std', 'min', 'max']].to_string())
 
 # Normalize volume column using log-scaling
 print("\n" + "="*60)
@@ -87,36 +172,33 @@ print("\n" + "="*60)
 print("DETECTING OUTLIERS USING IQR METHOD")
 print("="*60)
 
-# Calculate IQR (Interquartile Range)
-Q1 = df['closing_price'].quantile(0.25)
-Q3 = df['closing_price'].quantile(0.75)
-IQR = Q3 - Q1
-
-# Define outlier bounds
-lower_bound = Q1 - 1.5 * IQR
-upper_bound = Q3 + 1.5 * IQR
-
-# Identify outliers
-outlier_mask = (df['closing_price'] < lower_bound) | (df['closing_price'] > upper_bound)
+# Calculate IQR (Interquartile Range) and the outlier bounds, per ticker
+if OUTLIER_RANK_ERROR:
+    bounds = sketch_iqr_bounds(price_sketches(df, ticker, OUTLIER_RANK_ERROR, WORKERS))
+else:
+    bounds = iqr_bounds(df, ticker)
+df = flag_outliers(df, bounds, ticker)
+outlier_mask = df['is_outlier'] == 1
 outliers = df[outlier_mask].copy()
 
-print(f"IQR Statistics:")
-print(f"  Q1 (25th percentile): {Q1:.2f}")
-print(f"  Q3 (75th percentile): {Q3:.2f}")
-print(f"  IQR: {IQR:.2f}")
-print(f"  Lower bound (Q1 - 1.5*IQR): {lower_bound:.2f}")
-print(f"  Upper bound (Q3 + 1.5*IQR): {upper_bound:.2f}")
+if ticker:
+    print(f"IQR Statistics per ticker ({len(bounds)} tickers):")
+    print(bounds.round(2).head(10).to_string())
+else:
+    Q1, Q3, IQR, lower_bound, upper_bound = bounds.iloc[0][['q1', 'q3', 'iqr', 'lower', 'upper']]
+    print(f"IQR Statistics:")
+    print(f"  Q1 (25th percentile): {Q1:.2f}")
+    print(f"  Q3 (75th percentile): {Q3:.2f}")
+    print(f"  IQR: {IQR:.2f}")
+    print(f"  Lower bound (Q1 - 1.5*IQR): {lower_bound:.2f}")
+    print(f"  Upper bound (Q3 + 1.5*IQR): {upper_bound:.2f}")
 print(f"\nOutliers detected: {outlier_mask.sum()}")
 
 if outlier_mask.sum() > 0:
     print("\nOutlier details:")
-    print(outliers[['date', 'closing_price', 'volume']].to_string(index=False))
-    
-    # Add outlier flag column
-    df['is_outlier'] = outlier_mask.astype(int)
+    print(outliers[([ticker] if ticker else []) + ['date', 'closing_price', 'volume']].to_string(index=False))
 else:
     print("No outliers detected.")
-    df['is_outlier'] = 0
 
 # Display summary statistics
 print("\n" + "="*60)
@@ -131,17 +213,21 @@ print(df['volume'].describe())
 print(f"\nVolume Statistics (log-scaled):")
 print(df['volume_log'].describe())
 print(f"\nReturn Statistics:")
-print(f"1-day return: mean={df['return_1day'].mean():.2f}%, std={df['return_1day'].std():.2f}%")
-print(f"7-day return: mean={df['return_7day'].mean():.2f}%, std={df['return_7day'].std():.2f}%")
+for h, column in zip(RETURN_HORIZONS, return_columns):
+    print(f"{h}-day return: mean={df[column].mean():.2f}%, std={df[column].std():.2f}%")
 
 # Save preprocessed dataset
-output_file = 'financial_data_preprocessed.csv'
-df.to_csv(output_file, index=False)
+output_file = write_table(df, output_file, OUTPUT_FORMAT,
+                          dtypes={TICKER_COLUMN: 'category', 'is_outlier': 'int8'})
 print(f"\nPreprocessed dataset saved to: {output_file}")
+if STATE_DIR:
+    save_state(df, observed_price, observed_volume, input_file, STATE_DIR, RETURN_HORIZONS, ticker,
+               OUTLIER_RANK_ERROR or 0.001)
+    print(f"Incremental state saved to: {STATE_DIR}")
 
 # Display sample of preprocessed data
 print("\n" + "="*60)
 print("SAMPLE OF PREPROCESSED DATA")
 print("="*60)
-print(df[['date', 'closing_price', 'volume', 'volume_log', 'return_1day', 
-          'return_7day', 'is_outlier']].head(10).to_string(index=False))
+print(df[['date', 'closing_price', 'volume', 'volume_log'] + return_columns
+         + ['is_outlier']].head(10).to_string(index=False))
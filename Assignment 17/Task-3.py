@@ -1,20 +1,153 @@
+import os
+import sys
+import multiprocessing
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.preprocessing import StandardScaler
 from datetime import datetime
+from output_formats import write_table, TableWriter
+from dataset_schemas import read_dataset
+from sensor_stream import SensorStream
+from sparse_encoding import category_codes, onehot_matrix, onehot_frame, save_sparse
+from sensor_shards import preprocess_sharded
+from sensor_rollups import RollupAccumulator, multi_resolution
+from sensor_partitions import write_partitioned, iter_partitioned, read_partitioned
+
+# Processing options
+# OUTPUT_FORMAT: 'csv' (default), 'parquet' or 'feather' (Arrow IPC); the
+# columnar formats keep categories, compact integers and native timestamps
+OUTPUT_FORMAT = 'csv'
+# STREAMING: process the file as a live feed with SensorStream, CHUNK_SIZE
+# readings at a time in file (arrival) order: forward fill, centered rolling
+# mean emitted one reading late, running standard scaling. Writes timestamp,
+# sensor_id, temperature and humidity only.
+STREAMING = False
+CHUNK_SIZE = 100_000
+# ONEHOT_ENCODING: 'dense' adds one boolean sensor_<id> column per sensor to
+# the output; 'sparse' writes the one-hot matrix to onehot_file (scipy .npz
+# plus a _columns.txt file) and keeps only sensor_id / sensor_id_encoded in
+# the table; 'none' skips the one-hot matrix. Use 'sparse' or 'none' with
+# many sensors, ideally with a columnar OUTPUT_FORMAT.
+ONEHOT_ENCODING = 'dense'
+# WORKERS: above 1, filling, smoothing and scaling run on sensor-hash shards
+# in a pool of this many processes; scaling statistics are merged from the
+# shards (see sensor_shards)
+WORKERS = 1
+# ROLLUP_FREQUENCIES: time buckets (finest first, each a multiple of the one
+# before, e.g. ['1min', '1h', '1D']) for which count/sum/min/max/mean of the
+# processed temperature and humidity per sensor are written to rollup_file.
+# Only the finest level reads the readings; coarser levels are merged from
+# the level below. Works in STREAMING mode too, writing buckets as they close.
+ROLLUP_FREQUENCIES = []
+# INPUT_PARTITIONS: read readings from this partitioned directory (one
+# directory per day and sensor-hash bucket, see sensor_partitions) instead of
+# input_file; it is built from input_file with PARTITION_BUCKETS buckets when
+# it does not exist yet. TIME_RANGE (start inclusive, end exclusive; None is
+# open) and SENSORS (list of sensor ids, None for all) then only open the
+# partitions that can match, and the sorted partitions are merged instead of
+# re-sorting the table. With plain input_file they filter rows after reading.
+INPUT_PARTITIONS = None
+TIME_RANGE = (None, None)
+SENSORS = None
+# OUTPUT_PARTITIONS: also write the preprocessed table to this directory in
+# the same partitioned layout, in OUTPUT_FORMAT
+OUTPUT_PARTITIONS = None
+PARTITION_BUCKETS = 16
+
+# Rolling mean window for removing sensor drift (can be adjusted based on
+# data frequency)
+window_size = 3
+
+input_file = 'iot_sensor.csv'
+output_file = 'iot_sensor_preprocessed.csv'
+onehot_file = 'iot_sensor_onehot.npz'
+summary_file = 'iot_sensor_summary.csv'
+rollup_file = 'iot_sensor_rollup_{}.csv'
+rollup_dtypes = {'sensor_id': 'category', 'temperature_count': 'int32', 'humidity_count': 'int32'}
+
+# Workers of a spawn-only platform would re-run this unguarded script
+if WORKERS > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+    raise ValueError("WORKERS > 1 needs the fork start method, which this platform lacks; "
+                     "set WORKERS = 1")
+
+
+def filter_readings(readings):
+    """
+    Apply TIME_RANGE and SENSORS to readings read from input_file. Sensors
+    filtered out leave the categories too, so sensor_id_encoded and the
+    one-hot columns match a pushed-down read of INPUT_PARTITIONS.
+    """
+    keep = pd.Series(True, index=readings.index)
+    if TIME_RANGE[0] is not None:
+        keep &= readings['timestamp'] >= pd.Timestamp(TIME_RANGE[0])
+    if TIME_RANGE[1] is not None:
+        keep &= readings['timestamp'] < pd.Timestamp(TIME_RANGE[1])
+    if SENSORS is not None:
+        keep &= readings['sensor_id'].astype(str).isin([str(sensor) for sensor in SENSORS])
+    readings = readings[keep]
+    return readings.assign(sensor_id=readings['sensor_id'].cat.remove_unused_categories())
+
+
+if INPUT_PARTITIONS and not os.path.isdir(INPUT_PARTITIONS):
+    partitions = write_partitioned(read_dataset(input_file, 'iot_sensor'), INPUT_PARTITIONS,
+                                   PARTITION_BUCKETS, OUTPUT_FORMAT, dtypes={'sensor_id': 'category'})
+    print(f"Partitioned {input_file} into {partitions} partitions under {INPUT_PARTITIONS}")
+
+if STREAMING:
+    source = INPUT_PARTITIONS or input_file
+    print(f"Streaming {source} through SensorStream...")
+    stream = SensorStream(window=3)
+    writer = TableWriter(output_file, OUTPUT_FORMAT, dtypes={'sensor_id': 'category'})
+    # One accumulator per rollup level; each level is fed the buckets closed
+    # by the level below it
+    rollup_levels = [(RollupAccumulator(freq), TableWriter(rollup_file.format(freq), OUTPUT_FORMAT,
+                                                           dtypes=rollup_dtypes))
+                     for freq in ROLLUP_FREQUENCIES]
+    readings = 0
+    if INPUT_PARTITIONS:
+        # One merged day at a time, in time order
+        chunks = iter_partitioned(INPUT_PARTITIONS, 'iot_sensor', *TIME_RANGE, SENSORS)
+    else:
+        chunks = (filter_readings(chunk)
+                  for chunk in read_dataset(input_file, 'iot_sensor', chunksize=CHUNK_SIZE))
+    for chunk in chunks:
+        readings += len(chunk)
+        emitted = stream.update(chunk)
+        writer.write(emitted)
+        watermark = stream.watermark()
+        for accumulator, rollup_writer in rollup_levels:
+            emitted = accumulator.update(emitted, watermark)
+            if len(emitted):
+                rollup_writer.write(emitted)
+    emitted = stream.flush()
+    writer.write(emitted)
+    writer.close()
+    for accumulator, rollup_writer in rollup_levels:
+        accumulator.update(emitted)
+        emitted = accumulator.flush()
+        if len(emitted):
+            rollup_writer.write(emitted)
+        rollup_writer.close()
+        print(f"{accumulator.freq} rollups saved to: {rollup_writer.path}")
+    print(f"Readings: {readings}, sensors: {len(stream.sensors)}")
+    print(f"Running mean: temperature={stream.mean[0]:.2f}, humidity={stream.mean[1]:.2f}")
+    print(f"Preprocessed dataset saved to: {writer.path}")
+    sys.exit(0)
 
 # Load the dataset
 print("Loading IoT sensor dataset...")
-df = pd.read_csv('iot_sensor.csv')
+if INPUT_PARTITIONS:
+    df = read_partitioned(INPUT_PARTITIONS, 'iot_sensor', *TIME_RANGE, SENSORS)
+else:
+    df = filter_readings(read_dataset(input_file, 'iot_sensor'))
 
 print(f"Original dataset shape: {df.shape}")
 print(f"Original columns: {df.columns.tolist()}\n")
 
-# Convert timestamp to datetime
-df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-
 # Sort by timestamp and sensor_id to ensure proper order for forward fill
-df = df.sort_values(['timestamp', 'sensor_id']).reset_index(drop=True)
+# (partitioned input arrives in this order already)
+if not INPUT_PARTITIONS:
+    df = df.sort_values(['timestamp', 'sensor_id']).reset_index(drop=True)
 
 # Display initial missing values
 print("="*60)
@@ -33,24 +166,27 @@ print("="*60)
 temp_missing_before = df['temperature'].isna().sum()
 humidity_missing_before = df['humidity'].isna().sum()
 
-# Convert to numeric
-df['temperature'] = pd.to_numeric(df['temperature'], errors='coerce')
-df['humidity'] = pd.to_numeric(df['humidity'], errors='coerce')
-
-# Forward fill missing values (carry forward last known value)
-# Group by sensor_id to forward fill within each sensor's data
-df['temperature'] = df.groupby('sensor_id')['temperature'].ffill()
-df['humidity'] = df.groupby('sensor_id')['humidity'].ffill()
-
-# If still missing (first values for a sensor), use backward fill
-df['temperature'] = df.groupby('sensor_id')['temperature'].bfill()
-df['humidity'] = df.groupby('sensor_id')['humidity'].bfill()
-
-# If still missing, fill with overall mean
-if df['temperature'].isna().any():
-    df['temperature'] = df['temperature'].fillna(df['temperature'].mean())
-if df['humidity'].isna().any():
-    df['humidity'] = df['humidity'].fillna(df['humidity'].mean())
+if WORKERS > 1:
+    # Fill, smooth and scale every shard of sensors in parallel; the steps
+    # below only report on the results
+    df, smoothed, scaling = preprocess_sharded(df, window_size, WORKERS)
+    df['temperature_original'] = smoothed['temperature']
+    df['humidity_original'] = smoothed['humidity']
+else:
+    # Forward fill missing values (carry forward last known value)
+    # Group by sensor_id to forward fill within each sensor's data
+    df['temperature'] = df.groupby('sensor_id')['temperature'].ffill()
+    df['humidity'] = df.groupby('sensor_id')['humidity'].ffill()
+
+    # If still missing (first values for a sensor), use backward fill
+    df['temperature'] = df.groupby('sensor_id')['temperature'].bfill()
+    df['humidity'] = df.groupby('sensor_id')['humidity'].bfill()
+
+    # If still missing, fill with overall mean
+    if df['temperature'].isna().any():
+        df['temperature'] = df['temperature'].fillna(df['temperature'].mean())
+    if df['humidity'].isna().any():
+        df['humidity'] = df['humidity'].fillna(df['humidity'].mean())
 
 print(f"Temperature: {temp_missing_before} missing values handled")
 print(f"Humidity: {humidity_missing_before} missing values handled")
@@ -64,23 +200,21 @@ print("REMOVING SENSOR DRIFT USING ROLLING MEAN")
 print("="*60)
 
 # Apply rolling mean to smooth out sensor drift
-# Using window size of 3 (can be adjusted based on data frequency)
-window_size = 3
-
-# Calculate rolling mean for each sensor separately
-df['temperature_rolling_mean'] = df.groupby('sensor_id')['temperature'].transform(
-    lambda x: x.rolling(window=window_size, min_periods=1, center=True).mean()
-)
-df['humidity_rolling_mean'] = df.groupby('sensor_id')['humidity'].transform(
-    lambda x: x.rolling(window=window_size, min_periods=1, center=True).mean()
-)
-
-# Replace original values with rolling mean to remove drift
-df['temperature'] = df['temperature_rolling_mean']
-df['humidity'] = df['humidity_rolling_mean']
-
-# Drop the intermediate rolling mean columns
-df = df.drop(['temperature_rolling_mean', 'humidity_rolling_mean'], axis=1)
+if WORKERS == 1:
+    # Calculate rolling mean for each sensor separately
+    df['temperature_rolling_mean'] = df.groupby('sensor_id')['temperature'].transform(
+        lambda x: x.rolling(window=window_size, min_periods=1, center=True).mean()
+    )
+    df['humidity_rolling_mean'] = df.groupby('sensor_id')['humidity'].transform(
+        lambda x: x.rolling(window=window_size, min_periods=1, center=True).mean()
+    )
+
+    # Replace original values with rolling mean to remove drift
+    df['temperature'] = df['temperature_rolling_mean']
+    df['humidity'] = df['humidity_rolling_mean']
+
+    # Drop the intermediate rolling mean columns
+    df = df.drop(['temperature_rolling_mean', 'humidity_rolling_mean'], axis=1)
 
 print(f"Applied rolling mean with window size: {window_size}")
 print("Sensor drift removed from temperature and humidity readings\n")
@@ -90,28 +224,31 @@ print("="*60)
 print("NORMALIZING READINGS USING STANDARD SCALING")
 print("="*60)
 
-# Store original values for comparison
-df['temperature_original'] = df['temperature'].copy()
-df['humidity_original'] = df['humidity'].copy()
+if WORKERS == 1:
+    # Store original values for comparison
+    df['temperature_original'] = df['temperature'].copy()
+    df['humidity_original'] = df['humidity'].copy()
 
-# Apply standard scaling (z-score normalization)
-# StandardScaler: (x - mean) / std
-scaler_temp = StandardScaler()
-scaler_humidity = StandardScaler()
+    # Apply standard scaling (z-score normalization)
+    # StandardScaler: (x - mean) / std
+    scaler_temp = StandardScaler()
+    scaler_humidity = StandardScaler()
 
-df['temperature_normalized'] = scaler_temp.fit_transform(df[['temperature']])
-df['humidity_normalized'] = scaler_humidity.fit_transform(df[['humidity']])
+    df['temperature_normalized'] = scaler_temp.fit_transform(df[['temperature']])
+    df['humidity_normalized'] = scaler_humidity.fit_transform(df[['humidity']])
 
-# Replace original columns with normalized values
-df['temperature'] = df['temperature_normalized']
-df['humidity'] = df['humidity_normalized']
+    # Replace original columns with normalized values
+    df['temperature'] = df['temperature_normalized']
+    df['humidity'] = df['humidity_normalized']
 
-# Drop intermediate columns
-df = df.drop(['temperature_normalized', 'humidity_normalized'], axis=1)
+    # Drop intermediate columns
+    df = df.drop(['temperature_normalized', 'humidity_normalized'], axis=1)
+    scaling = {'temperature': (scaler_temp.mean_[0], scaler_temp.scale_[0]),
+               'humidity': (scaler_humidity.mean_[0], scaler_humidity.scale_[0])}
 
 print("Standard scaling applied:")
-print(f"  Temperature - Mean: {scaler_temp.mean_[0]:.2f}, Std: {scaler_temp.scale_[0]:.2f}")
-print(f"  Humidity - Mean: {scaler_humidity.mean_[0]:.2f}, Std: {scaler_humidity.scale_[0]:.2f}")
+print(f"  Temperature - Mean: {scaling['temperature'][0]:.2f}, Std: {scaling['temperature'][1]:.2f}")
+print(f"  Humidity - Mean: {scaling['humidity'][0]:.2f}, Std: {scaling['humidity'][1]:.2f}")
 print(f"\nNormalized temperature range: [{df['temperature'].min():.4f}, {df['temperature'].max():.4f}]")
 print(f"Normalized humidity range: [{df['humidity'].min():.4f}, {df['humidity'].max():.4f}]\n")
 
@@ -120,20 +257,34 @@ print("="*60)
 print("ENCODING CATEGORICAL SENSOR IDs")
 print("="*60)
 
-# Use LabelEncoder for integer encoding
-label_encoder = LabelEncoder()
-df['sensor_id_encoded'] = label_encoder.fit_transform(df['sensor_id'])
+# Integer encoding with sorted sensor IDs (the LabelEncoder mapping); the
+# codes are derived once and reused for the one-hot encoding
+sensor_codes, sensor_classes = category_codes(df['sensor_id'])
+df['sensor_id_encoded'] = sensor_codes
 
 # Also create one-hot encoded columns (optional, for reference)
-sensor_onehot = pd.get_dummies(df['sensor_id'], prefix='sensor')
-df = pd.concat([df, sensor_onehot], axis=1)
+onehot_columns = []
+if ONEHOT_ENCODING == 'dense':
+    sensor_onehot = onehot_frame(sensor_codes, sensor_classes, prefix='sensor')
+    df = pd.concat([df, sensor_onehot], axis=1)
+    onehot_columns = sensor_onehot.columns.tolist()
+elif ONEHOT_ENCODING == 'sparse':
+    sensor_onehot = onehot_matrix(sensor_codes, len(sensor_classes))
+elif ONEHOT_ENCODING != 'none':
+    raise ValueError(f"Unknown ONEHOT_ENCODING {ONEHOT_ENCODING!r}; expected 'dense', 'sparse' or 'none'")
 
 print(f"Unique sensor IDs: {df['sensor_id'].unique()}")
 print(f"Encoded sensor IDs: {df['sensor_id_encoded'].unique()}")
 print("\nLabel encoding mapping:")
-for i, sensor in enumerate(label_encoder.classes_):
+for i, sensor in enumerate(sensor_classes[:20]):
     print(f"  {sensor} -> {i}")
-print("\nOne-hot encoding columns created:", sensor_onehot.columns.tolist())
+if len(sensor_classes) > 20:
+    print(f"  ... ({len(sensor_classes) - 20} more)")
+if ONEHOT_ENCODING == 'dense':
+    print("\nOne-hot encoding columns created:", onehot_columns)
+elif ONEHOT_ENCODING == 'sparse':
+    print(f"\nSparse one-hot matrix: {sensor_onehot.shape[0]} x {sensor_onehot.shape[1]}, "
+          f"{sensor_onehot.nnz} stored values")
 
 # Display summary statistics
 print("\n" + "="*60)
@@ -153,11 +304,18 @@ print(f"\nNormalized Humidity Statistics:")
 print(df['humidity'].describe())
 
 # Save preprocessed dataset
-output_file = 'iot_sensor_preprocessed.csv'
 # Save main columns (excluding original columns for cleaner output)
-columns_to_save = ['timestamp', 'sensor_id', 'sensor_id_encoded', 'temperature', 'humidity'] + sensor_onehot.columns.tolist()
-df[columns_to_save].to_csv(output_file, index=False)
+columns_to_save = ['timestamp', 'sensor_id', 'sensor_id_encoded', 'temperature', 'humidity'] + onehot_columns
+output_file = write_table(df[columns_to_save], output_file, OUTPUT_FORMAT,
+                          dtypes={'sensor_id': 'category', 'sensor_id_encoded': 'int32'})
 print(f"\nPreprocessed dataset saved to: {output_file}")
+if ONEHOT_ENCODING == 'sparse':
+    columns_file = save_sparse(onehot_file, sensor_onehot, [f'sensor_{sensor}' for sensor in sensor_classes])
+    print(f"Sparse one-hot matrix saved to: {onehot_file} (columns in {columns_file})")
+if OUTPUT_PARTITIONS:
+    partitions = write_partitioned(df[columns_to_save], OUTPUT_PARTITIONS, PARTITION_BUCKETS, OUTPUT_FORMAT,
+                                   dtypes={'sensor_id': 'category', 'sensor_id_encoded': 'int32'})
+    print(f"Partitioned copy saved to: {OUTPUT_PARTITIONS} ({partitions} partitions)")
 
 # Display sample of preprocessed data
 print("\n" + "="*60)
@@ -169,9 +327,27 @@ print(df[sample_cols].head(15).to_string(index=False))
 print("\n" + "="*60)
 print("SENSOR-WISE STATISTICS")
 print("="*60)
-for sensor in df['sensor_id'].unique():
-    sensor_data = df[df['sensor_id'] == sensor]
-    print(f"\nSensor {sensor}:")
-    print(f"  Count: {len(sensor_data)}")
-    print(f"  Temperature (normalized): mean={sensor_data['temperature'].mean():.4f}, std={sensor_data['temperature'].std():.4f}")
-    print(f"  Humidity (normalized): mean={sensor_data['humidity'].mean():.4f}, std={sensor_data['humidity'].std():.4f}")
+# One grouped aggregation for all sensors, saved as a compact table
+sensor_summary = df.groupby('sensor_id', observed=True).agg(
+    count=('temperature', 'size'),
+    temperature_mean=('temperature', 'mean'),
+    temperature_std=('temperature', 'std'),
+    humidity_mean=('humidity', 'mean'),
+    humidity_std=('humidity', 'std'),
+).reset_index()
+summary_file = write_table(sensor_summary, summary_file, OUTPUT_FORMAT,
+                           dtypes={'sensor_id': 'category', 'count': 'int32'})
+print(f"Normalized temperature/humidity per sensor ({len(sensor_summary)} sensors):")
+print(sensor_summary.head(20).to_string(index=False, float_format=lambda value: f'{value:.4f}'))
+if len(sensor_summary) > 20:
+    print(f"... ({len(sensor_summary) - 20} more)")
+print(f"\nSensor summary saved to: {summary_file}")
+
+if ROLLUP_FREQUENCIES:
+    print("\n" + "="*60)
+    print("TIME-BUCKET ROLLUPS")
+    print("="*60)
+    rollups = multi_resolution(df, ROLLUP_FREQUENCIES)
+    for freq, table in rollups.items():
+        path = write_table(table, rollup_file.format(freq), OUTPUT_FORMAT, dtypes=rollup_dtypes)
+        print(f"{freq}: {len(table)} sensor buckets saved to: {path}")
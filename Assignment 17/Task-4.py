@@ -1,14 +1,201 @@
+import sys
+import time
+import multiprocessing
+import tracemalloc
 import pandas as pd
 import numpy as np
-import re
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.preprocessing import MinMaxScaler
+from text_normalization import standardize_text_series
+from output_formats import write_table, TableWriter
+from dataset_schemas import read_dataset
+from sparse_encoding import save_sparse
+from streaming_tfidf import StreamingTfidf
+from quantile_sketch import KLLSketch
+from review_encoder import ReviewEncoder, save_encoder, load_encoder
+from review_search import ReviewSearchIndex
+from review_embeddings import TfidfReducer, ReservoirSample
 import warnings
 warnings.filterwarnings('ignore')
 
+# Processing options
+# WORKERS > 1 standardizes review text in a pool of that many processes
+WORKERS = 1
+# OUTPUT_FORMAT: 'csv' (default), 'parquet' or 'feather' (Arrow IPC); the
+# columnar formats keep categories, compact integers and native timestamps
+OUTPUT_FORMAT = 'csv'
+
+# The TF-IDF matrix stays sparse (CSR) and is saved to tfidf_file (scipy
+# .npz), with the vocabulary in movie_reviews_tfidf_columns.txt and the
+# review_id of every row in movie_reviews_tfidf_rows.txt; the table holds no
+# tfidf_ columns
+tfidf_file = 'movie_reviews_tfidf.npz'
+# STREAMING: out-of-core mode for review sets larger than memory. Reads
+# CHUNK_SIZE reviews at a time in two passes: the first accumulates hashed
+# document frequencies (HASH_FEATURES columns, see streaming_tfidf) and a
+# rating sketch for the median fill, the second writes the table chunk by
+# chunk and one TF-IDF matrix per chunk (movie_reviews_tfidf_00000.npz with
+# its _rows.txt, ...). Hashed columns have no vocabulary file and no
+# max_features limit; the median is exact up to the sketch's rank error.
+STREAMING = False
+CHUNK_SIZE = 100_000
+HASH_FEATURES = 2 ** 20
+
+# ENCODER_DIR: directory of versioned encoder artifacts (fitted vectorizer,
+# rating scaler and median fill, see review_encoder). Fitting - in memory or
+# STREAMING - saves the fitted state there as a new version; None skips it.
+ENCODER_DIR = None
+# TRANSFORM_ONLY: encode input_file with the encoder saved in ENCODER_DIR
+# (ENCODER_VERSION, the newest when None) in batches of CHUNK_SIZE, without
+# refitting; writes the table and one TF-IDF matrix per batch, as STREAMING
+TRANSFORM_ONLY = False
+ENCODER_VERSION = None
+# SIMILAR_REVIEWS: above 0, index the TF-IDF rows (inverted index, see
+# review_search) and write the SIMILAR_REVIEWS most similar other reviews of
+# every review to similar_file
+SIMILAR_REVIEWS = 0
+# EMBEDDING_DIMENSIONS: above 0, also reduce the TF-IDF rows to this many
+# float32 dimensions with a randomized TruncatedSVD (see review_embeddings)
+# fitted on a random sample of EMBEDDING_SAMPLE reviews (drawn during the
+# first pass when STREAMING) and write them with review_id to embeddings_file
+# in batches of CHUNK_SIZE. Reports explained variance, throughput and peak
+# memory (traced with tracemalloc, which slows the run down); the reducer is
+# saved with the encoder.
+EMBEDDING_DIMENSIONS = 0
+EMBEDDING_SAMPLE = 100_000
+
+input_file = 'movie_reviews.csv'
+output_file = 'movie_reviews_preprocessed.csv'
+similar_file = 'movie_reviews_similar.csv'
+embeddings_file = 'movie_reviews_embeddings.csv'
+
+# Workers of a spawn-only platform would re-run this unguarded script
+if WORKERS > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+    raise ValueError("WORKERS > 1 needs the fork start method, which this platform lacks; "
+                     "set WORKERS = 1")
+
+
+def embedding_frame(review_ids, embeddings, reducer):
+    frame = pd.DataFrame(embeddings, columns=reducer.columns())
+    frame.insert(0, 'review_id', np.asarray(review_ids))
+    return frame
+
+
+def report_reduction(reducer, rows, seconds, peak=None, traced='fit + transform'):
+    print(f"  Dimensions: {len(reducer.columns())} float32, explained variance: "
+          f"{reducer.explained_variance:.1%} (on the fit sample)")
+    print(f"  Transform: {rows / max(seconds, 1e-9):,.0f} reviews/s")
+    if peak is not None:
+        print(f"  Peak memory ({traced}): {peak / 2 ** 20:.1f} MiB")
+
+
+def encode_in_batches(encoder):
+    """
+    Encode input_file CHUNK_SIZE reviews at a time, writing the table,
+    movie_reviews_tfidf_00000.npz, ... and, with a reducer, the embeddings.
+    Returns (table path, reviews, batches, mean TF-IDF per column,
+    {column: term}).
+    """
+    writer = TableWriter(output_file, OUTPUT_FORMAT, dtypes={'review_id': 'int32'})
+    embeddings_writer = None
+    if encoder.reducer is not None:
+        embeddings_writer = TableWriter(embeddings_file, OUTPUT_FORMAT, dtypes={'review_id': 'int32'})
+    vocabulary = encoder.feature_names()
+    terms = dict(enumerate(vocabulary)) if vocabulary is not None else {}
+    column_totals = 0
+    reviews = batches = 0
+    reduce_seconds = 0.0
+    for chunk in read_dataset(input_file, 'movie_reviews', chunksize=CHUNK_SIZE):
+        table, matrix = encoder.encode(chunk, workers=WORKERS)
+        if vocabulary is None and batches == 0:
+            # Hashed columns: name the terms of the first batch
+            terms = encoder.vectorizer.term_columns(table['review_text_standardized'])
+        column_totals = column_totals + np.asarray(matrix.sum(axis=0)).ravel()
+        save_sparse(tfidf_file.replace('.npz', f'_{batches:05d}.npz'), matrix, vocabulary,
+                    row_labels=chunk['review_id'])
+        writer.write(table)
+        if embeddings_writer is not None:
+            start = time.perf_counter()
+            embeddings = encoder.reducer.transform(matrix)
+            reduce_seconds += time.perf_counter() - start
+            embeddings_writer.write(embedding_frame(chunk['review_id'], embeddings, encoder.reducer))
+        reviews += len(chunk)
+        batches += 1
+    writer.close()
+    if embeddings_writer is not None:
+        embeddings_writer.close()
+        print(f"Embeddings saved to: {embeddings_writer.path}")
+        # Traced by STREAMING runs from their first pass on
+        peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+        report_reduction(encoder.reducer, reviews, reduce_seconds, peak, 'both passes')
+    return writer.path, reviews, batches, column_totals / max(reviews, 1), terms
+
+
+def report_batches(path, reviews, batches, column_means, terms):
+    print(f"Reviews: {reviews}, batches: {batches}")
+    print("Top 10 TF-IDF columns:")
+    for column in np.argsort(-np.atleast_1d(column_means), kind='stable')[:10]:
+        if column_means[column] > 0:
+            print(f"  {terms.get(int(column), f'column {column}')}: {column_means[column]:.6f}")
+    print(f"Preprocessed dataset saved to: {path}")
+
+
+if TRANSFORM_ONLY:
+    artifact = load_encoder(ENCODER_DIR, ENCODER_VERSION)
+    print(f"Encoding {input_file} with encoder v{artifact['version']} ({artifact['created']}, "
+          f"scikit-learn {artifact['sklearn']})...")
+    start = time.perf_counter()
+    results = encode_in_batches(artifact['encoder'])
+    seconds = time.perf_counter() - start
+    report_batches(*results)
+    print(f"Encoded in {seconds:.2f} s ({results[1] / seconds:,.0f} reviews/s)")
+    sys.exit(0)
+
+if STREAMING:
+    print(f"Streaming TF-IDF over {input_file} in chunks of {CHUNK_SIZE}...")
+    vectorizer = StreamingTfidf(n_features=HASH_FEATURES, ngram_range=(1, 2), min_df=1, max_df=0.95,
+                                stop_words='english')
+    rating_sketch = KLLSketch()
+    rating_min, rating_max = np.inf, -np.inf
+    sample = None
+    if EMBEDDING_DIMENSIONS > 0:
+        tracemalloc.start()
+        sample = ReservoirSample(EMBEDDING_SAMPLE)
+    # Pass 1: document frequencies, rating statistics and the reducer's sample
+    for chunk in read_dataset(input_file, 'movie_reviews', chunksize=CHUNK_SIZE):
+        texts = standardize_text_series(chunk['review_text'], workers=WORKERS)
+        vectorizer.partial_fit(texts)
+        if sample is not None:
+            sample.update(texts)
+        ratings = chunk['rating'].dropna().to_numpy(dtype=float)
+        if len(ratings):
+            rating_sketch.update(ratings)
+            rating_min, rating_max = min(rating_min, ratings.min()), max(rating_max, ratings.max())
+    median_rating = rating_sketch.quantile(0.5)
+    # The range of the filled ratings (the median lies inside it). With no
+    # rating at all the median is NaN and the ratings stay missing, as in memory
+    if rating_sketch.count == 0:
+        rating_min = rating_max = median_rating
+    scaler = MinMaxScaler(feature_range=(0, 1)).fit(pd.DataFrame({'rating': [rating_min, rating_max]}))
+    reducer = None
+    if sample is not None:
+        reducer = TfidfReducer(EMBEDDING_DIMENSIONS, EMBEDDING_SAMPLE).fit(
+            vectorizer.transform(sample.items))
+    encoder = ReviewEncoder(vectorizer, scaler, median_rating, reducer)
+    print(f"Hashed columns in use: {vectorizer.kept_features()} of {HASH_FEATURES}")
+    print(f"Median rating: {median_rating:.2f}")
+    if ENCODER_DIR:
+        version, path = save_encoder(encoder, ENCODER_DIR)
+        print(f"Encoder v{version} saved to: {path}")
+
+    # Pass 2: transform and write chunk by chunk
+    report_batches(*encode_in_batches(encoder))
+    tracemalloc.stop()
+    sys.exit(0)
+
 # Load the dataset
 print("Loading movie reviews dataset...")
-df = pd.read_csv('movie_reviews.csv')
+df = read_dataset(input_file, 'movie_reviews')
 
 print(f"Original dataset shape: {df.shape}")
 print(f"Original columns: {df.columns.tolist()}\n")
@@ -33,32 +220,8 @@ print("\n" + "="*60)
 print("STANDARDIZING TEXT")
 print("="*60)
 
-def standardize_text(text):
-    """
-    Standardize text by:
-    - Converting to lowercase
-    - Removing HTML tags
-    - Removing extra whitespace
-    """
-    if pd.isna(text):
-        return ""
-    
-    # Convert to string
-    text = str(text)
-    
-    # Remove HTML tags
-    text = re.sub(r'<[^>]+>', '', text)
-    
-    # Convert to lowercase
-    text = text.lower()
-    
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    return text
-
 # Apply text standardization
-df['review_text_standardized'] = df['review_text'].apply(standardize_text)
+df['review_text_standardized'] = standardize_text_series(df['review_text'], workers=WORKERS)
 
 print("Text standardization completed:")
 print(f"  - Converted to lowercase")
@@ -78,7 +241,6 @@ missing_ratings_before = df['rating'].isna().sum()
 median_rating = df['rating'].median()
 
 # Fill missing ratings with median
-df['rating'] = pd.to_numeric(df['rating'], errors='coerce')
 df['rating'] = df['rating'].fillna(median_rating)
 
 print(f"Missing ratings before: {missing_ratings_before}")
@@ -125,22 +287,15 @@ tfidf_vectorizer = TfidfVectorizer(
     stop_words='english'  # Remove English stopwords
 )
 
-# Fit and transform the standardized reviews
+# Fit and transform the standardized reviews (a sparse CSR matrix, one row
+# per review)
 tfidf_matrix = tfidf_vectorizer.fit_transform(df['review_text_standardized'])
-
-# Convert to DataFrame for better visualization
 feature_names = tfidf_vectorizer.get_feature_names_out()
-df_tfidf = pd.DataFrame(
-    tfidf_matrix.toarray(),
-    columns=[f'tfidf_{name}' for name in feature_names]
-)
-
-# Add TF-IDF features to main dataframe
-df = pd.concat([df, df_tfidf], axis=1)
 
 print(f"TF-IDF encoding completed:")
 print(f"  Vocabulary size: {len(feature_names)}")
 print(f"  Feature matrix shape: {tfidf_matrix.shape}")
+print(f"  Stored values: {tfidf_matrix.nnz} ({tfidf_matrix.nnz / max(np.prod(tfidf_matrix.shape), 1):.1%} of the matrix)")
 print(f"\nTop 10 TF-IDF features:")
 # Get mean TF-IDF scores for each feature
 feature_importance = pd.Series(
@@ -151,11 +306,13 @@ print(feature_importance.head(10))
 
 # Display sample TF-IDF encoding for first review
 print(f"\nSample TF-IDF encoding for first review:")
-first_review_features = df_tfidf.iloc[0]
-top_features = first_review_features.nlargest(5)
+# Only the stored (non-zero) entries of the row; ties keep vocabulary order
+first_review_features = tfidf_matrix[0]
+top = np.lexsort((first_review_features.indices, -first_review_features.data))[:5]
 print("Top 5 features:")
-for feature, score in top_features.items():
-    print(f"  {feature}: {score:.4f}")
+for position in top:
+    feature = feature_names[first_review_features.indices[position]]
+    print(f"  tfidf_{feature}: {first_review_features.data[position]:.4f}")
 
 # Generate before vs after summary report
 print("\n" + "="*60)
@@ -166,8 +323,8 @@ print("\n" + "-"*60)
 print("1. DATASET OVERVIEW")
 print("-"*60)
 print(f"  Before: {df_original.shape[0]} reviews, {df_original.shape[1]} columns")
-print(f"  After:  {df.shape[0]} reviews, {df.shape[1]} columns")
-print(f"  New features added: {df.shape[1] - df_original.shape[1]}")
+print(f"  After:  {df.shape[0]} reviews, {df.shape[1]} columns + {tfidf_matrix.shape[1]} sparse TF-IDF features")
+print(f"  New features added: {df.shape[1] - df_original.shape[1] + tfidf_matrix.shape[1]}")
 
 print("\n" + "-"*60)
 print("2. TEXT PREPROCESSING")
@@ -228,13 +385,50 @@ print("  [OK] Reviews encoded using TF-IDF")
 print("  [OK] Ready for machine learning models")
 
 # Save preprocessed dataset
-output_file = 'movie_reviews_preprocessed.csv'
-# Save main columns (excluding TF-IDF features for readability, but include key columns)
-columns_to_save = ['review_id', 'review_text', 'review_text_standardized', 
-                   'rating_original', 'rating'] + [col for col in df.columns if col.startswith('tfidf_')]
-df[columns_to_save].to_csv(output_file, index=False)
+# Save main columns; the TF-IDF features go to the sparse tfidf_file
+columns_to_save = ['review_id', 'review_text', 'review_text_standardized',
+                   'rating_original', 'rating']
+output_file = write_table(df[columns_to_save], output_file, OUTPUT_FORMAT,
+                          dtypes={'review_id': 'int32'})
+vocabulary_file = save_sparse(tfidf_file, tfidf_matrix, feature_names, row_labels=df['review_id'])
 print(f"\n" + "="*60)
 print(f"Preprocessed dataset saved to: {output_file}")
+print(f"TF-IDF matrix saved to: {tfidf_file} (vocabulary in {vocabulary_file})")
+if SIMILAR_REVIEWS > 0:
+    start = time.perf_counter()
+    search_index = ReviewSearchIndex().add(tfidf_matrix, df['review_id'].to_numpy())
+    similar = search_index.similar_to(df['review_id'].to_numpy(), k=SIMILAR_REVIEWS)
+    seconds = time.perf_counter() - start
+    similar_file = write_table(similar, similar_file, OUTPUT_FORMAT,
+                               dtypes={'source_id': 'int32', 'review_id': 'int32', 'rank': 'int16'})
+    print(f"Top-{SIMILAR_REVIEWS} similar reviews saved to: {similar_file} "
+          f"({1000 * seconds / max(len(df), 1):.2f} ms per review)")
+reducer = None
+if EMBEDDING_DIMENSIONS > 0:
+    print(f"Reducing TF-IDF to {EMBEDDING_DIMENSIONS} dimensions (TruncatedSVD)...")
+    tracemalloc.start()
+    reducer = TfidfReducer(EMBEDDING_DIMENSIONS, EMBEDDING_SAMPLE).fit(tfidf_matrix)
+    start = time.perf_counter()
+    embeddings_writer = TableWriter(embeddings_file, OUTPUT_FORMAT, dtypes={'review_id': 'int32'})
+    for offset, embeddings in zip(range(0, len(df), CHUNK_SIZE),
+                                  reducer.transform_batches(tfidf_matrix, CHUNK_SIZE)):
+        embeddings_writer.write(embedding_frame(df['review_id'].iloc[offset:offset + CHUNK_SIZE],
+                                                embeddings, reducer))
+    embeddings_writer.close()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    tfidf_bytes = tfidf_matrix.data.nbytes + tfidf_matrix.indices.nbytes + tfidf_matrix.indptr.nbytes
+    print(f"Embeddings saved to: {embeddings_writer.path}")
+    report_reduction(reducer, len(df), seconds, peak)
+    print(f"  Size: {len(df) * len(reducer.columns()) * 4 / 2 ** 20:.2f} MiB dense float32 vs "
+          f"{tfidf_bytes / 2 ** 20:.2f} MiB sparse TF-IDF")
+
+if ENCODER_DIR:
+    # Fitted state for TRANSFORM_ONLY runs on new reviews
+    version, encoder_file = save_encoder(ReviewEncoder(tfidf_vectorizer, scaler, median_rating, reducer),
+                                         ENCODER_DIR)
+    print(f"Encoder v{version} saved to: {encoder_file}")
 print("="*60)
 
 # Save summary report to file
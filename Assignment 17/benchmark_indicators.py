@@ -0,0 +1,97 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from technical_indicators import DEFAULT_INDICATORS, compute_indicators
+
+# Throughput of technical_indicators.compute_indicators against the same
+# indicators built from one pandas groupby/rolling/ewm call each, on a
+# synthetic long-format price file (random-walk closes, 1,000 tickers, or
+# fewer on small inputs so each ticker has at least 100 rows and every
+# window is checked). The run fails if any column disagrees with pandas.
+# Usage: python benchmark_indicators.py [rows]   (default 10,000,000)
+
+
+def make_prices(n_rows, n_tickers=1000, seed=7):
+    n_tickers = max(1, min(n_tickers, n_rows // 100))
+    rng = np.random.default_rng(seed)
+    tickers = np.repeat(np.arange(n_tickers), -(-n_rows // n_tickers))[:n_rows]
+    walk = np.cumsum(rng.normal(0, 0.01, n_rows))
+    # Restart the walk at 100 for every ticker
+    starts = np.r_[0, np.flatnonzero(np.diff(tickers)) + 1]
+    walk -= np.repeat(walk[starts], np.diff(np.r_[starts, n_rows]))
+    prices = 100 * np.exp(walk)
+    return pd.DataFrame({'ticker': pd.Categorical(tickers), 'closing_price': prices})
+
+
+def pandas_indicators(df, indicators):
+    """
+    Reference implementation: one pandas pass per indicator and window, with
+    the library's conventions (RSI warm-up rows are NaN, a window without
+    losses is 100 and a flat one 50; a z-score over a flat window is 0).
+    """
+    grouped = df.groupby('ticker', observed=True)['closing_price']
+    keys = df['ticker']
+    position = grouped.cumcount()
+    log_prices = np.log(df['closing_price'])
+    step_returns = log_prices.groupby(keys, observed=True).diff()
+    out = {}
+    for h in indicators.get('log_return', []):
+        out[f'log_return_{h}'] = log_prices.groupby(keys, observed=True).diff(h)
+    for w in indicators.get('volatility', []):
+        out[f'volatility_{w}'] = step_returns.groupby(keys, observed=True).rolling(w).std().droplevel(0)
+    for w in indicators.get('sma', []):
+        out[f'sma_{w}'] = grouped.rolling(w).mean().droplevel(0)
+    for w in indicators.get('ema', []):
+        out[f'ema_{w}'] = grouped.transform(lambda s: s.ewm(span=w, adjust=False).mean())
+    changes = grouped.diff().fillna(0)
+    for w in indicators.get('rsi', []):
+        gain = changes.clip(lower=0).groupby(keys, observed=True).transform(
+            lambda s: s.ewm(alpha=1 / w, adjust=False).mean())
+        loss = (-changes).clip(lower=0).groupby(keys, observed=True).transform(
+            lambda s: s.ewm(alpha=1 / w, adjust=False).mean())
+        rsi = (100 - 100 / (1 + gain / loss)).mask(loss == 0, 100.0)
+        out[f'rsi_{w}'] = rsi.mask((loss == 0) & (gain == 0), 50.0).mask(position < w)
+    for w in indicators.get('zscore', []):
+        mean = grouped.rolling(w).mean().droplevel(0)
+        std = grouped.rolling(w).std().droplevel(0)
+        out[f'zscore_{w}'] = ((df['closing_price'] - mean) / std).mask(std == 0, 0.0)
+    return pd.DataFrame(out)
+
+
+n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+df = make_prices(n_rows)
+n_features = sum(len(windows) for windows in DEFAULT_INDICATORS.values())
+
+print("="*60)
+print(f"INDICATOR BENCHMARK ({n_rows:,} rows, {n_features} indicator columns)")
+print("="*60)
+start = time.perf_counter()
+library = compute_indicators(df, DEFAULT_INDICATORS, 'ticker')
+library_seconds = time.perf_counter() - start
+print(f"technical_indicators {library_seconds:7.2f} s   {n_rows / library_seconds:14,.0f} rows/s")
+
+start = time.perf_counter()
+reference = pandas_indicators(df, DEFAULT_INDICATORS)
+pandas_seconds = time.perf_counter() - start
+print(f"pandas per indicator {pandas_seconds:7.2f} s   {n_rows / pandas_seconds:14,.0f} rows/s")
+print(f"speedup: {pandas_seconds / library_seconds:.1f}x")
+
+print("\nAgreement with pandas (NaN positions must match):")
+failed = []
+for column in reference.columns:
+    ours, theirs = library[column].to_numpy(), reference[column].to_numpy()
+    same_nan = np.array_equal(np.isnan(ours), np.isnan(theirs))
+    compared = ~np.isnan(theirs)
+    if not compared.any():
+        print(f"  {column:15s} NaN masks {'match' if same_nan else 'DIFFER'}, "
+              f"no values (series shorter than the window)")
+    else:
+        difference = np.abs(ours[compared] - theirs[compared]).max()
+        print(f"  {column:15s} max abs difference {difference:.2e} over {compared.sum():,} values")
+    if not same_nan or not np.allclose(ours, theirs, rtol=1e-6, atol=1e-8, equal_nan=True):
+        failed.append(column)
+if failed:
+    sys.exit(f"Indicators disagree with pandas: {failed}")
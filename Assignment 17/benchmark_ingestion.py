@@ -0,0 +1,95 @@
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from dataset_schemas import read_dataset
+
+# Compare the original ingestion (inferred read_csv, then to_numeric and
+# to_datetime without a format) with the schema-driven read_dataset on
+# synthetic copies of the four datasets. Each load runs in its own process
+# so peak memory (ru_maxrss, Linux/macOS) is measured independently.
+# Usage: python benchmark_ingestion.py [rows]   (default 10,000,000)
+
+CONVERSIONS = {
+    'social_media': (['likes', 'shares'], ['timestamp']),
+    'financial_data': (['closing_price', 'volume'], ['date']),
+    'iot_sensor': (['temperature', 'humidity'], ['timestamp']),
+    'movie_reviews': (['rating'], []),
+}
+
+
+def make_dataset(name, n_rows, path, seed=7):
+    """Write a synthetic CSV shaped like the sample dataset, with ~10% gaps."""
+    rng = np.random.default_rng(seed)
+    sample = pd.read_csv(f'{name}.csv')
+    df = sample.iloc[rng.integers(0, len(sample), n_rows)].reset_index(drop=True)
+    id_column = {'social_media': 'post_id', 'movie_reviews': 'review_id'}.get(name)
+    if id_column:
+        df[id_column] = np.arange(1, n_rows + 1)
+    numeric, timestamps = CONVERSIONS[name]
+    for column in numeric:
+        values = df[column].astype(float).fillna(1.0) * rng.uniform(0.5, 1.5, n_rows)
+        df[column] = values.round(2).where(rng.random(n_rows) > 0.1)
+    for column in timestamps:
+        start = pd.Timestamp(sample[column].dropna().iloc[0])
+        offsets = pd.to_timedelta(rng.integers(0, 365 * 24 * 3600, n_rows), unit='s')
+        stamps = start + offsets
+        df[column] = stamps.strftime('%Y-%m-%d' if column == 'date' else '%Y-%m-%d %H:%M:%S')
+    df.to_csv(path, index=False)
+
+
+def original_load(name, path):
+    df = pd.read_csv(path)
+    numeric, timestamps = CONVERSIONS[name]
+    for column in numeric:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    for column in timestamps:
+        df[column] = pd.to_datetime(df[column], errors='coerce')
+    return df
+
+
+def schema_load(name, path):
+    return read_dataset(path, name)
+
+
+def measure(loader, name, path, results):
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    df = loader(name, path)
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    results.put((seconds, (peak - baseline) * scale / 1e6,
+                 df.memory_usage(deep=True).sum() / 1e6))
+
+
+n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+context = multiprocessing.get_context('fork' if sys.platform != 'win32' else 'spawn')
+
+print("="*60)
+print(f"INGESTION BENCHMARK ({n_rows:,} rows per dataset)")
+print("="*60)
+with tempfile.TemporaryDirectory() as work_dir:
+    for name in CONVERSIONS:
+        path = os.path.join(work_dir, f'{name}.csv')
+        # Generated in a child too: a forked child starts from the parent's
+        # high-water RSS, which would hide part of each load's peak
+        process = context.Process(target=make_dataset, args=(name, n_rows, path))
+        process.start()
+        process.join()
+        print(f"\n{name} ({os.path.getsize(path) / 1e6:.0f} MB CSV)")
+        for label, loader in [('original', original_load), ('schema', schema_load)]:
+            results = context.Queue()
+            process = context.Process(target=measure, args=(loader, name, path, results))
+            process.start()
+            seconds, peak_mb, frame_mb = results.get()
+            process.join()
+            print(f"  {label:9s} load {seconds:7.2f} s   peak +{peak_mb:8.1f} MB   "
+                  f"frame {frame_mb:8.1f} MB")
@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from output_formats import write_table
+
+# Compare CSV against Parquet and Feather for the Assignment 17 outputs:
+# file size, write time and read-back time. Each preprocessed CSV is
+# replicated up to the requested row count first; the repeated rows compress
+# far better than real data would, so sizes are a lower bound.
+# Usage: python benchmark_output_formats.py [rows]   (default 1,000,000)
+
+DATASETS = {
+    'social_media_preprocessed.csv': {
+        'parse_dates': ['timestamp'],
+        'dtypes': {'user': 'category', 'weekday': 'category',
+                   'likes': 'int32', 'shares': 'int32', 'hour': 'Int8'},
+    },
+    'financial_data_preprocessed.csv': {
+        'parse_dates': ['date'],
+        'dtypes': {'is_outlier': 'int8'},
+    },
+    'iot_sensor_preprocessed.csv': {
+        'parse_dates': ['timestamp'],
+        'dtypes': {'sensor_id': 'category', 'sensor_id_encoded': 'int32'},
+    },
+    'movie_reviews_preprocessed.csv': {
+        'parse_dates': [],
+        'dtypes': {'review_id': 'int32'},
+    },
+}
+
+n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+print("="*60)
+print(f"OUTPUT FORMAT BENCHMARK ({n_rows:,} rows per dataset)")
+print("="*60)
+with tempfile.TemporaryDirectory() as work_dir:
+    for file_name, spec in DATASETS.items():
+        sample = pd.read_csv(file_name, parse_dates=spec['parse_dates'])
+        df = pd.concat([sample] * (n_rows // len(sample) + 1), ignore_index=True).head(n_rows)
+        print(f"\n{file_name}")
+        for output_format in ['csv', 'parquet', 'feather']:
+            start = time.perf_counter()
+            path = write_table(df, os.path.join(work_dir, file_name), output_format,
+                               dtypes=spec['dtypes'])
+            write_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            if output_format == 'csv':
+                pd.read_csv(path, parse_dates=spec['parse_dates'])
+            elif output_format == 'parquet':
+                pd.read_parquet(path)
+            else:
+                pd.read_feather(path)
+            read_seconds = time.perf_counter() - start
+
+            size_mb = os.path.getsize(path) / 1e6
+            print(f"  {output_format:8s} size {size_mb:10.3f} MB   "
+                  f"write {write_seconds:7.2f} s   read {read_seconds:7.2f} s")
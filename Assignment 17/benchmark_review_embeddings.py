@@ -0,0 +1,49 @@
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+from review_embeddings import TfidfReducer
+
+# Fit time, explained variance, transform throughput and peak memory of
+# TfidfReducer for a few dimensions, on synthetic L2-normalized TF-IDF rows
+# (30 Zipf-distributed terms per review over 50,000 terms), fitted on a
+# sample of 100,000 rows and transformed in batches of 100,000.
+# Usage: python benchmark_review_embeddings.py [reviews]   (default 1,000,000)
+
+
+def make_rows(n, n_features=50_000, terms=30, rng=None):
+    rng = rng or np.random.default_rng(7)
+    weights = np.arange(101, n_features + 101) ** -1.1
+    columns = rng.choice(n_features, n * terms, p=weights / weights.sum())
+    rows = np.repeat(np.arange(n), terms)
+    matrix = sparse.csr_matrix((rng.random(n * terms), (rows, columns)), shape=(n, n_features))
+    matrix.sum_duplicates()
+    return normalize(matrix)
+
+
+n_reviews = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+reviews = make_rows(n_reviews)
+sparse_bytes = reviews.data.nbytes + reviews.indices.nbytes + reviews.indptr.nbytes
+
+print("="*60)
+print(f"REVIEW EMBEDDINGS BENCHMARK ({n_reviews:,} reviews, "
+      f"{sparse_bytes / 2 ** 20:,.0f} MiB sparse)")
+print("="*60)
+for k in [50, 100, 300]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    reducer = TfidfReducer(k).fit(reviews)
+    fit_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for embeddings in reducer.transform_batches(reviews):
+        pass
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"  k={k:<4} fit {fit_seconds:6.1f} s   explained {reducer.explained_variance:6.1%}   "
+          f"{n_reviews / seconds:10,.0f} reviews/s   peak {peak / 2 ** 20:6.0f} MiB   "
+          f"dense {n_reviews * k * 4 / 2 ** 20:6.0f} MiB")
@@ -0,0 +1,56 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import MinMaxScaler
+
+from review_encoder import ReviewEncoder
+from text_normalization import standardize_text_series
+
+# Reviews per second of ReviewEncoder.encode (the Task-4 TRANSFORM_ONLY path)
+# against refitting the Task-4 vectorizer and scaler for every run, on
+# synthetic reviews of 10-40 words with some HTML and missing ratings.
+# Usage: python benchmark_review_encoder.py [reviews]   (default 1,000,000)
+
+WORDS = ('movie film plot acting story great terrible amazing boring director scene music '
+         'characters ending script cast performance visuals slow brilliant awful loved hated '
+         'classic sequel cinema drama comedy thriller horror action').split()
+
+
+def make_reviews(n, seed=7):
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(10, 41, n)
+    words = np.array(WORDS, dtype=object)[rng.integers(0, len(WORDS), lengths.sum())]
+    bounds = np.r_[0, np.cumsum(lengths)]
+    texts = [' '.join(words[bounds[i]:bounds[i + 1]]) for i in range(n)]
+    texts = ['<p>' + text.capitalize() + '!</p>' if i % 3 == 0 else text for i, text in enumerate(texts)]
+    ratings = rng.uniform(0, 10, n).round(1)
+    ratings[rng.random(n) < 0.05] = np.nan
+    return pd.DataFrame({'review_id': np.arange(1, n + 1), 'review_text': texts, 'rating': ratings})
+
+
+n_reviews = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+reviews = make_reviews(n_reviews)
+
+print("="*60)
+print(f"REVIEW ENCODER BENCHMARK ({n_reviews:,} reviews)")
+print("="*60)
+start = time.perf_counter()
+standardized = standardize_text_series(reviews['review_text'])
+vectorizer = TfidfVectorizer(max_features=100, ngram_range=(1, 2), min_df=1, max_df=0.95,
+                             stop_words='english').fit(standardized)
+median_rating = reviews['rating'].median()
+scaler = MinMaxScaler().fit(reviews[['rating']].fillna(median_rating))
+fit_seconds = time.perf_counter() - start
+print(f"  fit (every run without artifacts)  {fit_seconds:8.2f} s")
+
+encoder = ReviewEncoder(vectorizer, scaler, median_rating)
+for batch_size in [10_000, 100_000]:
+    start = time.perf_counter()
+    for offset in range(0, n_reviews, batch_size):
+        encoder.encode(reviews.iloc[offset:offset + batch_size])
+    seconds = time.perf_counter() - start
+    print(f"  encode, batches of {batch_size:>7,}        {seconds:8.2f} s   "
+          f"{n_reviews / seconds:12,.0f} reviews/s")
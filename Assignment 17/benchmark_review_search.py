@@ -0,0 +1,59 @@
+import sys
+import time
+
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+from review_search import ReviewSearchIndex
+
+# Top-10 similar-review latency of ReviewSearchIndex against scoring every
+# review (one sparse matrix-vector product over the whole matrix), on
+# synthetic L2-normalized TF-IDF rows: 30 terms per review drawn from a
+# Zipf distribution, without the 100 most frequent terms (as stop words and
+# max_df remove them), over 50,000 terms. The index is built by incremental
+# adds of 10,000 reviews.
+# Usage: python benchmark_review_search.py [reviews]   (default 1,000,000)
+
+
+def make_rows(n, n_features=50_000, terms=30, rng=None):
+    rng = rng or np.random.default_rng(7)
+    weights = np.arange(101, n_features + 101) ** -1.1
+    columns = rng.choice(n_features, n * terms, p=weights / weights.sum())
+    rows = np.repeat(np.arange(n), terms)
+    matrix = sparse.csr_matrix((rng.random(n * terms), (rows, columns)), shape=(n, n_features))
+    matrix.sum_duplicates()
+    return normalize(matrix)
+
+
+n_reviews = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+rng = np.random.default_rng(7)
+reviews = make_rows(n_reviews, rng=rng)
+queries = make_rows(1000, rng=rng)
+
+print("="*60)
+print(f"REVIEW SEARCH BENCHMARK ({n_reviews:,} reviews)")
+print("="*60)
+index = ReviewSearchIndex()
+start = time.perf_counter()
+for offset in range(0, n_reviews, 10_000):
+    index.add(reviews[offset:offset + 10_000], np.arange(offset, min(offset + 10_000, n_reviews)))
+print(f"  build by adds of 10,000      {time.perf_counter() - start:8.2f} s")
+
+start = time.perf_counter()
+for row in range(100):
+    index.search(queries[row], k=10)
+print(f"  single queries               {(time.perf_counter() - start) * 10:8.2f} ms/query")
+start = time.perf_counter()
+found = index.search(queries, k=10)
+print(f"  batch of 1,000 queries       {time.perf_counter() - start:8.2f} ms/query")
+
+# Cosine similarity with every review, on a few queries
+by_term = reviews.T.tocsc()
+start = time.perf_counter()
+for row in range(10):
+    similarity = queries[row].toarray()[0] @ by_term
+    best = np.argsort(-similarity)[:10]
+print(f"  scoring every review         {(time.perf_counter() - start) * 100:8.2f} ms/query")
+exact = np.sort(similarity)[::-1][:10]
+print(f"  top-10 scores match          {np.allclose(exact, found[found['query'] == 9]['score'])}")
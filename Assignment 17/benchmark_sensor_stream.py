@@ -0,0 +1,68 @@
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from sensor_stream import SensorStream
+
+# Readings per second of SensorStream for different micro-batch sizes on a
+# synthetic feed (1,000 sensors, ~10% missing values): push() on NumPy
+# arrays, and update() on DataFrame chunks with categorical sensor ids as
+# Task-3 reads them. Single readings take push()'s scalar path; per-batch
+# overhead is fixed, so only large batches reach the vectorized rate.
+# Usage: python benchmark_sensor_stream.py [readings]   (default 10,000,000)
+
+
+def cpu_name():
+    """Processor model for the report (/proc/cpuinfo on Linux, else platform)."""
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+n_readings = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+rng = np.random.default_rng(7)
+timestamps = (np.datetime64('2025-02-01T00:00:00', 'ns')
+              + np.arange(n_readings).astype('timedelta64[ms]'))
+sensor_codes = rng.integers(0, 1000, n_readings)
+sensor_names = np.array([f'S{i}' for i in range(1000)], dtype=object)
+sensor_ids = sensor_names[sensor_codes]
+values = np.column_stack([rng.normal(24, 3, n_readings), rng.normal(45, 8, n_readings)])
+values[rng.random(values.shape) < 0.1] = np.nan
+frame = pd.DataFrame({'timestamp': timestamps,
+                      'sensor_id': pd.Categorical.from_codes(sensor_codes, sensor_names),
+                      'temperature': values[:, 0], 'humidity': values[:, 1]})
+
+print("="*60)
+print(f"SENSOR STREAM BENCHMARK ({n_readings:,} readings)")
+print(f"{cpu_name()}, {os.cpu_count()} CPUs, Python {platform.python_version()}, "
+      f"NumPy {np.__version__}, pandas {pd.__version__}")
+print("="*60)
+for batch_size in [1, 100, 10_000, 100_000, 1_000_000]:
+    # Keep the small-batch runs short
+    n = min(n_readings, batch_size * 20_000)
+    stream = SensorStream()
+    start = time.perf_counter()
+    for offset in range(0, n, batch_size):
+        end = offset + batch_size
+        stream.push(timestamps[offset:end], sensor_ids[offset:end], values[offset:end])
+    stream.push(timestamps[:0], sensor_ids[:0], values[:0], final=True)
+    seconds = time.perf_counter() - start
+    print(f"  push   batch {batch_size:>9,}   {n:>11,} readings   {n / seconds:14,.0f} readings/s")
+for batch_size in [10_000, 100_000, 1_000_000]:
+    stream = SensorStream()
+    start = time.perf_counter()
+    for offset in range(0, n_readings, batch_size):
+        stream.update(frame.iloc[offset:offset + batch_size])
+    stream.flush()
+    seconds = time.perf_counter() - start
+    print(f"  update batch {batch_size:>9,}   {n_readings:>11,} readings   "
+          f"{n_readings / seconds:14,.0f} readings/s")
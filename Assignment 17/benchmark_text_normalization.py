@@ -0,0 +1,99 @@
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from nltk.corpus import stopwords
+
+from text_normalization import (clean_text_series, standardize_text_series,
+                                get_stop_words)
+
+# Benchmark the shared text-normalization engine against the original
+# per-row Series.apply implementations from Task-1 and Task-4, then measure
+# how clean_text_series scales over a process pool.
+# Usage: python benchmark_text_normalization.py [rows ...]
+# (defaults to 1,000,000 and 10,000,000 synthetic posts)
+
+
+def legacy_clean_text(text):
+    """Original Task-1 clean_text, kept verbatim as the baseline."""
+    if pd.isna(text):
+        return ""
+    text = str(text)
+    text = re.sub(r'<[^>]+>', '', text)
+    text = re.sub(r'http\S+|www.\S+', '', text)
+    text = re.sub(r'[^a-zA-Z0-9\s]', '', text)
+    text = text.lower()
+    text = re.sub(r'\s+', ' ', text).strip()
+    stop_words = set(stopwords.words('english'))
+    words = text.split()
+    cleaned_words = [word for word in words if word not in stop_words and len(word) > 1]
+    return ' '.join(cleaned_words)
+
+
+def legacy_standardize_text(text):
+    """Original Task-4 standardize_text, kept verbatim as the baseline."""
+    if pd.isna(text):
+        return ""
+    text = str(text)
+    text = re.sub(r'<[^>]+>', '', text)
+    text = text.lower()
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def make_posts(n_rows, seed=42):
+    """Build n_rows synthetic posts mixing HTML, URLs, hashtags and stopwords."""
+    rng = np.random.default_rng(seed)
+    templates = np.array([
+        "This is a sample POST!!! #fun",
+        "<html>Great Day!</html>",
+        "Check out https://example.com/deal?id=7 it's the BEST   offer",
+        "<p>I   can't believe   what I saw at www.news.org today...</p>",
+        "Loving the new album by @artist ❤ #music #2025",
+        "a b c and the of to in is it",
+    ])
+    suffixes = np.array(["", " again", " #trending", " lol!!", " <br/> more"])
+    posts = (pd.Series(templates[rng.integers(0, len(templates), n_rows)]) +
+             pd.Series(suffixes[rng.integers(0, len(suffixes), n_rows)]))
+    posts[rng.random(n_rows) < 0.01] = np.nan
+    return posts
+
+
+def time_it(func, posts):
+    start = time.perf_counter()
+    result = func(posts)
+    return result, time.perf_counter() - start
+
+
+sizes = [int(arg) for arg in sys.argv[1:]] or [1_000_000, 10_000_000]
+get_stop_words()  # load the stopword set outside the timed region
+
+print("="*60)
+print("TEXT NORMALIZATION BENCHMARK")
+print("="*60)
+for n_rows in sizes:
+    posts = make_posts(n_rows)
+    print(f"\n{n_rows:,} posts")
+    for name, legacy, vectorized in [
+        ('clean_text', legacy_clean_text, clean_text_series),
+        ('standardize_text', legacy_standardize_text, standardize_text_series),
+    ]:
+        expected, legacy_seconds = time_it(lambda s: s.apply(legacy), posts)
+        result, new_seconds = time_it(vectorized, posts)
+        matches = (result.astype(str).to_numpy() == expected.astype(str).to_numpy()).all()
+        print(f"  {name}:")
+        print(f"    apply path:      {legacy_seconds:8.2f} s ({n_rows / legacy_seconds:,.0f} rows/s)")
+        print(f"    vectorized path: {new_seconds:8.2f} s ({n_rows / new_seconds:,.0f} rows/s)")
+        print(f"    speedup: {legacy_seconds / new_seconds:.1f}x, identical output: {matches}")
+
+    print(f"  clean_text_series scaling:")
+    _, serial_seconds = time_it(clean_text_series, posts)
+    workers = 2
+    while workers <= (os.cpu_count() or 1):
+        _, seconds = time_it(lambda s: clean_text_series(s, workers=workers), posts)
+        print(f"    {workers:2d} workers: {seconds:8.2f} s "
+              f"(speedup {serial_seconds / seconds:.1f}x, efficiency {serial_seconds / seconds / workers:.0%})")
+        workers *= 2
@@ -0,0 +1,109 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+# Persistent cache of cleaned post text for incremental re-runs of Task-1.
+# Entries are keyed by post_id and a 64-bit hash of post_text, so a post is
+# only re-cleaned when it is new or its text was edited. The cache lives in a
+# single SQLite file and is trimmed to max_entries, least recently used first.
+
+
+class CleanedTextCache:
+    """
+    SQLite-backed map of (post_id, hash of post_text) -> cleaned_text.
+
+    Every open of the cache counts as one run; entries remember the last run
+    that used them, and evict() (called after every store) drops the entries
+    unused for longest once the cache grows past max_entries. If the cleaning rules change (a different
+    fingerprint), the whole cache is discarded.
+    """
+
+    def __init__(self, path, max_entries=10_000_000, fingerprint=''):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS cache (
+                post_id TEXT PRIMARY KEY,
+                text_hash INTEGER NOT NULL,
+                cleaned_text TEXT NOT NULL,
+                last_used INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS cache_last_used ON cache (last_used);
+            CREATE TEMP TABLE lookup_keys (position INTEGER, post_id TEXT, text_hash INTEGER);
+            CREATE INDEX temp.lookup_keys_post_id ON lookup_keys (post_id);
+        """)
+        meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+        if meta.get('fingerprint', fingerprint) != fingerprint:
+            self.conn.execute("DELETE FROM cache")
+        self.run = int(meta.get('run', 0)) + 1
+        self.conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                              [('fingerprint', fingerprint), ('run', str(self.run))])
+        self.conn.commit()
+
+    @staticmethod
+    def _keys(post_ids, texts):
+        """Return post ids as strings and signed 64-bit hashes of the texts."""
+        hashes = pd.util.hash_pandas_object(texts, index=False).to_numpy().view(np.int64)
+        return post_ids.astype(str).tolist(), hashes.tolist()
+
+    def lookup(self, post_ids, texts):
+        """
+        Return a Series aligned with texts holding the cached cleaned text,
+        or None where the post is new or its text changed.
+        """
+        ids, hashes = self._keys(post_ids, texts)
+        self.conn.execute("DELETE FROM lookup_keys")
+        self.conn.executemany("INSERT INTO lookup_keys VALUES (?, ?, ?)",
+                              zip(range(len(ids)), ids, hashes))
+        rows = self.conn.execute("""
+            SELECT k.position, c.cleaned_text FROM lookup_keys k
+            JOIN cache c ON c.post_id = k.post_id AND c.text_hash = k.text_hash
+        """).fetchall()
+        # Driven from lookup_keys through the cache primary key, so the cost is
+        # one index probe per looked-up post rather than a scan of the cache
+        self.conn.execute("""
+            UPDATE cache SET last_used = ? WHERE post_id IN (
+                SELECT c.post_id FROM lookup_keys k
+                JOIN cache c ON c.post_id = k.post_id AND c.text_hash = k.text_hash)
+        """, (self.run,))
+        cached = [None] * len(ids)
+        for position, cleaned_text in rows:
+            cached[position] = cleaned_text
+        self.hits += len(rows)
+        self.misses += len(ids) - len(rows)
+        return pd.Series(cached, index=texts.index, dtype=object)
+
+    def store(self, post_ids, texts, cleaned_texts):
+        """
+        Insert or refresh the cleaned text for freshly cleaned posts, then trim
+        the cache, so a streaming run never holds more than max_entries plus
+        one chunk.
+        """
+        ids, hashes = self._keys(post_ids, texts)
+        self.conn.executemany("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+                              zip(ids, hashes, cleaned_texts.tolist(), [self.run] * len(ids)))
+        self.conn.commit()
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits max_entries."""
+        (size,) = self.conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+        excess = size - self.max_entries
+        if excess > 0:
+            self.conn.execute("""
+                DELETE FROM cache WHERE post_id IN (
+                    SELECT post_id FROM cache ORDER BY last_used LIMIT ?)
+            """, (excess,))
+            self.conn.commit()
+            self.evicted += excess
+        return size - max(excess, 0)
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+# Declared schemas for the four Assignment 17 datasets. read_dataset parses
+# each column straight into its final type in one pass: text and labels with
+# fixed dtypes, timestamps with a fixed format, numbers by the parser's own
+# (native) numeric conversion. Values that do not parse become NaN/NaT, as
+# with to_numeric/to_datetime(errors='coerce'), but that slower conversion
+# only runs when a column actually contains malformed values.
+#
+# Each schema names the engine with the lowest peak memory for its shape
+# (benchmark_ingestion.py): pyarrow is the fastest reader everywhere, but
+# for text-heavy files its Arrow buffers and the converted frame coexist,
+# so those use the C engine.
+
+SCHEMAS = {
+    'social_media': {
+        'dtypes': {'user': 'category', 'post_text': str},
+        'numeric': ['post_id', 'likes', 'shares'],
+        'timestamps': {'timestamp': '%Y-%m-%d %H:%M:%S'},
+        # likes/shares are only filled and cast to int, so float32 is enough
+        # whenever it holds every value exactly
+        'float32': ['likes', 'shares'],
+        # pyarrow loads 4x faster but peaks above the original inferred read
+        'engine': 'c',
+    },
+    'financial_data': {
+        # ticker only exists in long-format (multi-series) files
+        'dtypes': {'ticker': 'category'},
+        'numeric': ['closing_price', 'volume'],
+        'timestamps': {'date': '%Y-%m-%d'},
+        'float32': [],
+        # pyarrow reads date-only columns as date32, and converting those to
+        # datetime64 costs more than the C engine's fixed-format parse
+        'engine': 'c',
+        # For date-only text, converting after the read peaks lower than
+        # parse_dates does
+        'timestamps_after_read': True,
+    },
+    'iot_sensor': {
+        'dtypes': {'sensor_id': 'category'},
+        'numeric': ['temperature', 'humidity'],
+        'timestamps': {'timestamp': '%Y-%m-%d %H:%M:%S'},
+        'float32': [],
+    },
+    'movie_reviews': {
+        'dtypes': {'review_text': str},
+        'numeric': ['review_id', 'rating'],
+        'timestamps': {},
+        'float32': [],
+        # Almost all text: pyarrow peaks ~35% higher than the C engine
+        'engine': 'c',
+    },
+}
+
+
+def _pyarrow_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def downcast_numeric(df, float32_columns=()):
+    """
+    Shrink numeric columns in place to the smallest safe dtype: integers to
+    the narrowest integer type that holds their range, and the listed float
+    columns to float32 when every value survives the round trip exactly.
+    """
+    for column in df.columns:
+        values = df[column]
+        if isinstance(values.dtype, np.dtype) and values.dtype.kind in 'iu' and len(values):
+            # A range check and one astype; to_numeric(downcast=...) holds
+            # several temporary copies of the column
+            low, high = values.min(), values.max()
+            for dtype in (np.int8, np.int16, np.int32, np.int64):
+                if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+                    if dtype != values.dtype:
+                        df[column] = values.to_numpy().astype(dtype)
+                    break
+        elif column in float32_columns and pd.api.types.is_float_dtype(values):
+            as_float32 = values.to_numpy().astype(np.float32)
+            if np.array_equal(as_float32.astype(values.dtype), values.to_numpy(), equal_nan=True):
+                df[column] = as_float32
+    return df
+
+
+def _finish(df, schema):
+    """
+    Apply declared dtypes, coerce malformed numeric/timestamp columns, then
+    downcast. df.attrs['unparsed'] maps each coerced column to the number of
+    values that were present but did not parse (now NaN/NaT like the empty
+    ones).
+    """
+    for column, dtype in schema['dtypes'].items():
+        if column in df.columns and df[column].dtype != dtype:
+            df[column] = df[column].astype(dtype)
+    unparsed = {}
+    for column in schema['numeric']:
+        if column in df.columns and not pd.api.types.is_numeric_dtype(df[column]):
+            empty = df[column].isna().sum()
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+            unparsed[column] = int(df[column].isna().sum() - empty)
+    for column, date_format in schema['timestamps'].items():
+        if column in df.columns and not pd.api.types.is_datetime64_any_dtype(df[column]):
+            empty = df[column].isna().sum()
+            df[column] = pd.to_datetime(df[column], format=date_format, errors='coerce')
+            unparsed[column] = int(df[column].isna().sum() - empty)
+    df.attrs['unparsed'] = unparsed
+    return downcast_numeric(df, schema['float32'])
+
+
+def read_dataset(path, name, chunksize=None, engine=None, float_precision=None):
+    """
+    Read one of the Assignment 17 datasets with its declared schema.
+
+    Uses the pyarrow CSV engine when it is installed and the whole file is
+    read at once (unless the schema prefers another engine); chunked reads
+    (chunksize) use the C engine and return an iterator of typed chunks.
+    float_precision='round_trip' makes the C engine parse floats exactly, for
+    files whose derived columns are written to full precision.
+    """
+    schema = SCHEMAS[name]
+    if engine is None:
+        engine = schema.get('engine', 'pyarrow')
+        # Only probe (and so import) pyarrow when it would be used
+        if engine == 'pyarrow' and (chunksize or not _pyarrow_available()):
+            engine = 'c'
+    options = {'parse_dates': list(schema['timestamps'])}
+    if engine != 'pyarrow':
+        # The pyarrow engine parses ISO timestamps natively and its dtypes are
+        # applied after the read; the C engine takes both up front
+        options['dtype'] = schema['dtypes']
+        options['date_format'] = schema['timestamps']
+        if schema.get('timestamps_after_read'):
+            # Read as text; _finish converts them with the fixed format
+            del options['parse_dates'], options['date_format']
+        if float_precision:
+            options['float_precision'] = float_precision
+
+    if chunksize:
+        reader = pd.read_csv(path, chunksize=chunksize, engine=engine, **options)
+        return (_finish(chunk, schema) for chunk in reader)
+    return _finish(pd.read_csv(path, engine=engine, **options), schema)
@@ -0,0 +1,50 @@
+import numpy as np
+
+# Compact set of 64-bit digests for exact-duplicate detection over streams
+# too large for a Python set (~60-70 bytes per entry). Digests are kept in a
+# few sorted uint64 runs - 8 bytes per distinct digest, 16 while the two
+# largest runs merge - and a run is merged into the one before it once it
+# reaches half that run's size, so there are at most ~log2(n) runs and every
+# digest is re-sorted O(log n) times over the whole stream.
+#
+# At 1e9 distinct posts the set holds 8 GB. The chance that two different
+# texts share a 64-bit digest (and the later one is wrongly dropped as a
+# duplicate) is about n^2 / 2^65: ~3e-8 at 1e6 posts, ~3% at 1e9.
+
+
+class DigestSet:
+    """Set of uint64 digests stored as sorted, disjoint numpy runs."""
+
+    def __init__(self):
+        self.runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    @property
+    def nbytes(self):
+        return sum(run.nbytes for run in self.runs)
+
+    def add(self, digests):
+        """
+        Add an array of digests. Returns a boolean array marking the digests
+        that were already present - in the set, or earlier in this array.
+        """
+        digests = np.asarray(digests, dtype=np.uint64)
+        # Searching the runs with sorted keys keeps the lookups cache-friendly
+        unique, first = np.unique(digests, return_index=True)
+        known = np.zeros(len(unique), dtype=bool)
+        for run in self.runs:
+            positions = np.minimum(np.searchsorted(run, unique), len(run) - 1)
+            known |= run[positions] == unique
+        # Within the batch, every occurrence after the first is a repeat
+        seen = np.ones(len(digests), dtype=bool)
+        seen[first] = known
+        new = unique[~known]
+        if len(new):
+            self.runs.append(new)
+            while len(self.runs) > 1 and 2 * len(self.runs[-1]) >= len(self.runs[-2]):
+                # Two sorted runs: the stable sort merges them in linear time
+                merged = np.concatenate([self.runs[-2], self.runs[-1]])
+                self.runs[-2:] = [np.sort(merged, kind='stable')]
+        return seen
@@ -0,0 +1,138 @@
+import math
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+# Pre-aggregated engagement cube for the social-media pipeline.
+# Likes and shares are summarised per (user, hour, weekday) cell: post count,
+# sum, min and max, plus a log-bucketed histogram (a DDSketch-style quantile
+# sketch) for approximate quantiles. Cells from separate chunks merge by
+# adding counts, so the cube is built in one streaming pass and stored in a
+# small SQLite file that dashboards query instead of rescanning the CSV.
+
+CELL_KEYS = ['user', 'hour', 'weekday']
+METRICS = ['likes', 'shares']
+
+
+class EngagementCube:
+    """
+    Mergeable likes/shares aggregates by user x hour x weekday.
+
+    Quantiles are estimated from histogram buckets whose width grows
+    geometrically, so any reported quantile is within relative_accuracy of
+    a value in the data.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.cells = None
+        self.histogram = None
+
+    def _buckets(self, values):
+        """Map values to histogram buckets; zero and below share bucket -1."""
+        values = values.to_numpy(dtype=float)
+        buckets = np.full(len(values), -1, dtype=np.int64)
+        positive = values > 0
+        buckets[positive] = np.ceil(np.log(values[positive]) / math.log(self.gamma))
+        return buckets
+
+    def update(self, df):
+        """Fold a chunk of cleaned posts into the cube."""
+        if df.empty:
+            return
+        aggregations = {'posts': ('likes', 'size')}
+        for metric in METRICS:
+            aggregations[f'{metric}_sum'] = (metric, 'sum')
+            aggregations[f'{metric}_min'] = (metric, 'min')
+            aggregations[f'{metric}_max'] = (metric, 'max')
+        cells = df.groupby(CELL_KEYS, dropna=False).agg(**aggregations)
+
+        histogram = pd.concat([
+            df[CELL_KEYS].assign(metric=metric, bucket=self._buckets(df[metric]))
+            for metric in METRICS
+        ]).groupby(CELL_KEYS + ['metric', 'bucket'], dropna=False).size()
+
+        if self.cells is not None:
+            combined = pd.concat([self.cells, cells])
+            merge_rules = {column: ('min' if column.endswith('_min') else
+                                    'max' if column.endswith('_max') else 'sum')
+                           for column in cells.columns}
+            cells = combined.groupby(level=CELL_KEYS, dropna=False).agg(merge_rules)
+            histogram = pd.concat([self.histogram, histogram]).groupby(
+                level=list(range(histogram.index.nlevels)), dropna=False).sum()
+        self.cells = cells
+        self.histogram = histogram
+
+    def save(self, path):
+        """Write the cube to a SQLite file, replacing any previous cube."""
+        with sqlite3.connect(path) as conn:
+            conn.executescript("""
+                DROP TABLE IF EXISTS cells;
+                DROP TABLE IF EXISTS histogram;
+                DROP TABLE IF EXISTS meta;
+                CREATE TABLE meta (key TEXT PRIMARY KEY, value REAL);
+                CREATE TABLE cells (
+                    user TEXT, hour INTEGER, weekday TEXT, posts INTEGER,
+                    likes_sum INTEGER, likes_min INTEGER, likes_max INTEGER,
+                    shares_sum INTEGER, shares_min INTEGER, shares_max INTEGER,
+                    PRIMARY KEY (user, hour, weekday));
+                CREATE TABLE histogram (
+                    user TEXT, hour INTEGER, weekday TEXT, metric TEXT,
+                    bucket INTEGER, count INTEGER,
+                    PRIMARY KEY (user, hour, weekday, metric, bucket));
+                CREATE INDEX cells_hour_weekday ON cells (hour, weekday);
+            """)
+            conn.execute("INSERT INTO meta VALUES ('gamma', ?)", (self.gamma,))
+            if self.cells is None:
+                return
+            cells = self.cells.reset_index().astype(object)
+            conn.executemany("INSERT INTO cells VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             cells.where(cells.notna(), None).itertuples(index=False))
+            histogram = self.histogram.reset_index().astype(object)
+            conn.executemany("INSERT INTO histogram VALUES (?, ?, ?, ?, ?, ?)",
+                             histogram.where(histogram.notna(), None).itertuples(index=False))
+
+
+def query_cube(path, user=None, hour=None, weekday=None, quantiles=(0.5, 0.9, 0.99)):
+    """
+    Look up engagement for every cell matching the given filters (None
+    matches all) and return posts plus likes/shares sum, mean, min, max and
+    approximate quantiles as a Series.
+    """
+    filters, params = [], []
+    for column, value in (('user', user), ('hour', hour), ('weekday', weekday)):
+        if value is not None:
+            filters.append(f"{column} = ?")
+            params.append(int(value) if column == 'hour' else value)
+    where = ("WHERE " + " AND ".join(filters)) if filters else ""
+
+    with sqlite3.connect(path) as conn:
+        (gamma,) = conn.execute("SELECT value FROM meta WHERE key = 'gamma'").fetchone()
+        totals = conn.execute(f"""
+            SELECT SUM(posts), SUM(likes_sum), MIN(likes_min), MAX(likes_max),
+                   SUM(shares_sum), MIN(shares_min), MAX(shares_max)
+            FROM cells {where}""", params).fetchone()
+        buckets = pd.read_sql_query(f"""
+            SELECT metric, bucket, SUM(count) AS count FROM histogram {where}
+            GROUP BY metric, bucket ORDER BY metric, bucket""", conn, params=params)
+
+    posts = totals[0] or 0
+    result = {'posts': posts}
+    for offset, metric in ((1, 'likes'), (4, 'shares')):
+        total, low, high = totals[offset:offset + 3]
+        result[f'{metric}_sum'] = total or 0
+        result[f'{metric}_mean'] = total / posts if posts else float('nan')
+        result[f'{metric}_min'] = low
+        result[f'{metric}_max'] = high
+        metric_buckets = buckets[buckets['metric'] == metric]
+        cumulative = metric_buckets['count'].cumsum().to_numpy()
+        for q in quantiles:
+            if not posts:
+                result[f'{metric}_p{q * 100:g}'] = float('nan')
+                continue
+            bucket = metric_buckets['bucket'].to_numpy()[np.searchsorted(cumulative, q * (posts - 1) + 1)]
+            estimate = 0.0 if bucket < 0 else 2 * gamma ** bucket / (gamma + 1)
+            result[f'{metric}_p{q * 100:g}'] = min(max(estimate, low), high)
+    return pd.Series(result)
@@ -0,0 +1,536 @@
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from dataset_schemas import read_dataset
+from output_formats import TableWriter, write_table
+from quantile_sketch import KLLSketch
+from technical_indicators import compute_indicators
+
+# Ticker-aware preprocessing for long-format price files (one row per ticker
+# per date). Every step runs over all tickers at once - grouped fills,
+# grouped quantiles and lag returns from a single shifted array with a
+# group-boundary mask - so there is no Python loop per ticker. Without a
+# ticker column the whole file is treated as one series, which gives exactly
+# the single-series results.
+
+
+def sort_series(df, by=None):
+    """Order rows by ticker, then date."""
+    if by is None:
+        return df.sort_values('date').reset_index(drop=True)
+    return df.sort_values([by, 'date'], kind='stable').reset_index(drop=True)
+
+
+def group_codes(df, by=None):
+    """Integer ticker code per row (all zeros for a single series)."""
+    if by is None:
+        return np.zeros(len(df), dtype=np.int64)
+    return pd.factorize(df[by])[0]
+
+
+def fill_prices(df, by=None):
+    """
+    Fill closing_price per ticker: forward fill, backward fill, then the
+    ticker mean (the overall mean for tickers with no prices at all).
+    """
+    if by is None:
+        prices = df['closing_price'].ffill().bfill()
+        if prices.isna().any():
+            prices = prices.fillna(prices.mean())
+    else:
+        prices = df.groupby(by, observed=True)['closing_price'].ffill()
+        prices = prices.groupby(df[by], observed=True).bfill()
+        if prices.isna().any():
+            prices = prices.fillna(prices.groupby(df[by], observed=True).transform('mean'))
+            prices = prices.fillna(prices.mean())
+    df['closing_price'] = prices
+    return df
+
+
+def fill_volume(df, by=None):
+    """Fill missing volume with the ticker median."""
+    if by is None:
+        df['volume'] = df['volume'].fillna(df['volume'].median())
+    else:
+        medians = df.groupby(by, observed=True)['volume'].transform('median')
+        df['volume'] = df['volume'].fillna(medians).fillna(df['volume'].median())
+    return df
+
+
+def add_lag_returns(df, horizons=(1, 7), by=None):
+    """
+    Add return_{h}day percentage returns for every horizon h. Rows are
+    expected in (ticker, date) order; returns never reach across tickers
+    and the first h rows of each ticker are 0, as with pct_change().fillna(0).
+    """
+    prices = df['closing_price'].to_numpy(dtype=float)
+    codes = group_codes(df, by)
+    for h in horizons:
+        previous = np.full(len(prices), np.nan)
+        if h < len(prices):
+            previous[h:] = prices[:-h]
+            previous[h:][codes[h:] != codes[:-h]] = np.nan
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = (prices / previous - 1) * 100
+        df[f'return_{h}day'] = np.where(np.isnan(returns), 0.0, returns)
+    return df
+
+
+def iqr_bounds(df, by=None):
+    """
+    Return Q1, Q3, IQR and the 1.5 * IQR outlier bounds of closing_price,
+    as a one-row frame for a single series or one row per ticker.
+    """
+    if by is None:
+        q1 = pd.Series([df['closing_price'].quantile(0.25)])
+        q3 = pd.Series([df['closing_price'].quantile(0.75)])
+    else:
+        grouped = df.groupby(by, observed=True)['closing_price']
+        q1, q3 = grouped.quantile(0.25), grouped.quantile(0.75)
+    bounds = pd.DataFrame({'q1': q1, 'q3': q3})
+    bounds['iqr'] = bounds['q3'] - bounds['q1']
+    bounds['lower'] = bounds['q1'] - 1.5 * bounds['iqr']
+    bounds['upper'] = bounds['q3'] + 1.5 * bounds['iqr']
+    return bounds
+
+
+def price_sketches(df, by=None, rank_error=0.001, workers=1):
+    """
+    Summarise closing_price in mergeable KLL sketches: a dict of ticker ->
+    sketch, or {None: sketch} for a single series. With workers > 1 row
+    shards are sketched in a pool of that many processes and merged.
+    """
+    if workers > 1 and len(df) > 1:
+        bounds = np.linspace(0, len(df), min(len(df), 4 * workers) + 1).astype(int)
+        shards = (df.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:]))
+        return _pool_sketches(shards, by, rank_error, workers)
+    if by is None:
+        return {None: KLLSketch(rank_error).update(df['closing_price'].to_numpy())}
+    prices = df['closing_price'].to_numpy(dtype=float)
+    return {key: KLLSketch(rank_error).update(prices[index])
+            for key, index in df.groupby(by, observed=True).indices.items()}
+
+
+def merge_sketches(sketches, other):
+    """Merge one ticker -> sketch dict into another (e.g. from a worker)."""
+    for key, sketch in other.items():
+        if key in sketches:
+            sketches[key].merge(sketch)
+        else:
+            sketches[key] = sketch
+    return sketches
+
+
+def sketch_iqr_bounds(sketches):
+    """Same frame as iqr_bounds, with Q1 and Q3 estimated from the sketches."""
+    quartiles = np.array([sketch.quantile([0.25, 0.75]) for sketch in sketches.values()])
+    index = [0] if list(sketches) == [None] else list(sketches)
+    bounds = pd.DataFrame(quartiles.reshape(-1, 2), index=index, columns=['q1', 'q3'])
+    bounds['iqr'] = bounds['q3'] - bounds['q1']
+    bounds['lower'] = bounds['q1'] - 1.5 * bounds['iqr']
+    bounds['upper'] = bounds['q3'] + 1.5 * bounds['iqr']
+    return bounds
+
+
+def flag_outliers(df, bounds, by=None):
+    """Add is_outlier (0/1) using the bounds from iqr_bounds."""
+    if by is None:
+        lower, upper = bounds['lower'].iloc[0], bounds['upper'].iloc[0]
+    else:
+        lower = df[by].map(bounds['lower']).to_numpy(dtype=float)
+        upper = df[by].map(bounds['upper']).to_numpy(dtype=float)
+    outlier_mask = (df['closing_price'] < lower) | (df['closing_price'] > upper)
+    df['is_outlier'] = outlier_mask.astype(int)
+    return df
+
+
+def _chunk_sketches(args):
+    chunk, by, rank_error = args
+    return price_sketches(chunk, by, rank_error)
+
+
+def _pool_sketches(chunks, by, rank_error, workers):
+    """Sketch each frame of chunks in a pool of worker processes and merge them."""
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context()
+    sketches = {}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        pending = []
+        for chunk in chunks:
+            pending.append(pool.submit(_chunk_sketches, (chunk, by, rank_error)))
+            # Keep at most two chunks per worker in flight
+            if len(pending) >= 2 * workers:
+                merge_sketches(sketches, pending.pop(0).result())
+        for future in pending:
+            merge_sketches(sketches, future.result())
+    return sketches
+
+
+def flag_outliers_streaming(input_path, output_path, by=None, rank_error=0.001,
+                            chunksize=1_000_000, workers=1, output_format='csv'):
+    """
+    Recompute is_outlier for a (preprocessed) price file of any size in two
+    streaming passes. Pass 1 builds per-ticker KLL sketches chunk by chunk -
+    in a pool of `workers` processes when workers > 1 - and merges them;
+    pass 2 flags each chunk against the resulting IQR bounds and writes it.
+    Memory holds a few chunks plus the sketches. Floats are parsed exactly,
+    so the other columns are copied unchanged. Returns (bounds, outliers
+    flagged, path written).
+    """
+    def chunks():
+        for chunk in read_dataset(input_path, 'financial_data', chunksize=chunksize,
+                                  float_precision='round_trip'):
+            yield chunk.drop(columns='is_outlier', errors='ignore')
+
+    if workers > 1:
+        sketches = _pool_sketches(chunks(), by, rank_error, workers)
+    else:
+        sketches = {}
+        for chunk in chunks():
+            merge_sketches(sketches, price_sketches(chunk, by, rank_error))
+    bounds = sketch_iqr_bounds(sketches)
+
+    outliers = 0
+    writer = TableWriter(output_path, output_format, dtypes={by: 'category', 'is_outlier': 'int8'})
+    for chunk in chunks():
+        chunk = flag_outliers(chunk, bounds, by)
+        outliers += int(chunk['is_outlier'].sum())
+        writer.write(chunk)
+    writer.close()
+    return bounds, outliers, writer.path
+
+
+def preprocess(df, horizons=(1, 7), by=None, indicators=None):
+    """
+    Run the whole Task-2 feature pipeline on one in-memory frame;
+    indicators (see technical_indicators) are added when given.
+    """
+    df = sort_series(df, by)
+    df = fill_prices(df, by)
+    df = fill_volume(df, by)
+    df = add_lag_returns(df, horizons, by)
+    if indicators:
+        df = compute_indicators(df, indicators, by)
+    df['volume_log'] = np.log1p(df['volume'])
+    return flag_outliers(df, iqr_bounds(df, by), by)
+
+
+def preprocess_partitioned(input_path, output_path, by, horizons=(1, 7), partitions=64,
+                           chunksize=1_000_000, output_format='csv', indicators=None,
+                           rank_error=None, workers=1):
+    """
+    Preprocess a long-format file larger than memory. Pass 1 streams the
+    input in chunks and spreads rows over `partitions` temporary files by
+    ticker hash; pass 2 processes one partition (a complete set of tickers)
+    at a time. Peak memory is about one chunk or one partition, whichever is
+    larger. Output rows are grouped by partition, then ordered by ticker and
+    date. Returns (rows, tickers, outliers, path written).
+
+    Outliers are flagged against each ticker's exact quartiles. With a
+    rank_error the partitions are written to a temporary CSV instead and
+    flag_outliers_streaming re-flags it into the output against KLL sketch
+    quartiles (built by `workers` processes).
+
+    A file without the `by` column is one series, which cannot be split, so
+    it is processed in memory as a single partition.
+    """
+    if by is None or by not in pd.read_csv(input_path, nrows=0).columns:
+        df = preprocess(read_dataset(input_path, 'financial_data'), horizons, None, indicators)
+        if rank_error:
+            df = flag_outliers(df, sketch_iqr_bounds(price_sketches(df, None, rank_error, workers)))
+        path = write_table(df, output_path, output_format, dtypes={'is_outlier': 'int8'})
+        return len(df), 1, int(df['is_outlier'].sum()), path
+
+    rows = tickers = outliers = 0
+    with tempfile.TemporaryDirectory() as work_dir:
+        paths = [os.path.join(work_dir, f'part-{i:04d}.csv') for i in range(partitions)]
+        for chunk in read_dataset(input_path, 'financial_data', chunksize=chunksize):
+            part = pd.util.hash_array(chunk[by].astype(str).to_numpy(dtype=object)) % partitions
+            for i, piece in chunk.groupby(part):
+                piece.to_csv(paths[i], index=False, mode='a', header=not os.path.exists(paths[i]),
+                             date_format='%Y-%m-%d')
+
+        if rank_error:
+            writer = TableWriter(os.path.join(work_dir, 'preprocessed.csv'))
+        else:
+            writer = TableWriter(output_path, output_format,
+                                 dtypes={by: 'category', 'is_outlier': 'int8'})
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            df = preprocess(read_dataset(path, 'financial_data'), horizons, by, indicators)
+            rows += len(df)
+            tickers += df[by].nunique()
+            outliers += int(df['is_outlier'].sum())
+            writer.write(df)
+        writer.close()
+        if rank_error:
+            _, outliers, path = flag_outliers_streaming(writer.path, output_path, by, rank_error,
+                                                        chunksize, workers, output_format)
+            return rows, tickers, outliers, path
+    return rows, tickers, outliers, writer.path
+
+
+# Incremental (append-only) mode. The state directory holds state.json (how
+# far the input file has been consumed, plus run-wide price totals),
+# global.npz (a KLL sketch of every observed volume) and one .npz per series:
+# its last max(horizons) filled closes and last date, whether it has had a
+# close yet (and how many rows came before the first one), and KLL sketches
+# of its filled closes and observed volumes. Every part is bounded, so an
+# update costs the appended rows plus the state of the series they touch.
+#
+# Contract (point in time): each appended row gets the features a full
+# recompute over the input as it stands after that run gives it - exactly
+# while the series' sketches still hold every value (KLLSketch.exact, up to
+# about k values), and with the volume medians and IQR quartiles within the
+# sketches' rank error beyond that. Closes filled with the run-wide mean
+# (series without any close yet) match to float rounding, since the mean
+# comes from running totals. Rows written by earlier runs are never
+# revisited. As medians and quartiles move with new data, a later full
+# recompute can fill their volume (and volume_log) and flag is_outlier
+# differently, and closes that were mean-filled because the series had no
+# close yet get back-filled by it. update_incremental refuses appended rows
+# dated before a series' last processed row, which would break the contract.
+
+STATE_FILE = 'state.json'
+GLOBAL_FILE = 'global.npz'
+
+
+def _series_file(state_dir, key):
+    digest = hashlib.sha1(str(key).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(state_dir, f'series-{digest}.npz')
+
+
+def _sorted_quantile(values, q, grouped):
+    """
+    Linear-interpolated quantile of an already sorted array, computed the way
+    GroupBy.quantile (grouped) or Series.quantile does it, so the result is
+    bit-for-bit the one a full recompute gets.
+    """
+    position = q * (len(values) - 1)
+    lower = int(position)
+    fraction = position - lower
+    a, b = values[lower], values[min(lower + 1, len(values) - 1)]
+    if grouped or fraction < 0.5:
+        return a + (b - a) * fraction
+    return b - (b - a) * (1 - fraction)
+
+
+def _median(sketch):
+    """Median as fill_volume computes it while the sketch is exact, else estimated."""
+    if sketch.exact:
+        return float(np.median(sketch.levels[0])) if sketch.count else np.nan
+    return sketch.quantile(0.5)
+
+
+def _outlier_bounds(sketch, grouped):
+    """(lower, upper) as iqr_bounds computes them while the sketch is exact."""
+    if sketch.exact:
+        values = np.sort(sketch.levels[0])
+        q1, q3 = _sorted_quantile(values, 0.25, grouped), _sorted_quantile(values, 0.75, grouped)
+    else:
+        q1, q3 = sketch.quantile([0.25, 0.75])
+    return q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+
+
+def _sketch_arrays(name, sketch):
+    items, sizes = sketch.to_arrays()
+    return {f'{name}_items': items, f'{name}_sizes': sizes}
+
+
+def _load_sketch(stored, name, rank_error):
+    return KLLSketch.from_arrays(stored[f'{name}_items'], stored[f'{name}_sizes'], rank_error)
+
+
+def _save_series(state_dir, key, s):
+    np.savez(_series_file(state_dir, key), tail=s['tail'], last_date=s['last_date'],
+             observed=s['observed'], pending=s['pending'],
+             **_sketch_arrays('prices', s['prices']), **_sketch_arrays('volumes', s['volumes']))
+
+
+def _load_series(state_dir, key, rank_error):
+    path = _series_file(state_dir, key)
+    if not os.path.exists(path):
+        return {'tail': np.empty(0), 'last_date': np.iinfo(np.int64).min, 'observed': False,
+                'pending': 0, 'prices': KLLSketch(rank_error), 'volumes': KLLSketch(rank_error)}
+    with np.load(path) as stored:
+        return {'tail': stored['tail'], 'last_date': int(stored['last_date']),
+                'observed': bool(stored['observed']), 'pending': int(stored['pending']),
+                'prices': _load_sketch(stored, 'prices', rank_error),
+                'volumes': _load_sketch(stored, 'volumes', rank_error)}
+
+
+def _series_keys(df, by):
+    return df[by].astype(str).to_numpy() if by else np.zeros(len(df), dtype=object)
+
+
+def _lag_returns(context, prices, horizons):
+    """add_lag_returns for one series' new prices, given its previous closes."""
+    history = np.concatenate([context, prices])
+    positions = np.arange(len(context), len(history))
+    returns = {}
+    for h in horizons:
+        previous = np.full(len(prices), np.nan)
+        reachable = positions >= h
+        previous[reachable] = history[positions[reachable] - h]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = (prices / previous - 1) * 100
+        returns[h] = np.where(np.isnan(values), 0.0, values)
+    return returns
+
+
+def save_state(df, observed_price, observed_volume, input_path, state_dir, horizons=(1, 7),
+               by=None, rank_error=0.001):
+    """
+    Write the incremental state after a full in-memory run. df is the final
+    frame (filled, in (ticker, date) order); observed_price and
+    observed_volume mark the rows whose close and volume were present in the
+    input. rank_error sizes the KLL sketches.
+    """
+    os.makedirs(state_dir, exist_ok=True)
+    depth = max(horizons)
+    prices = df['closing_price'].to_numpy(dtype=float)
+    volumes = df['volume'].to_numpy(dtype=float)
+    observed_price = np.asarray(observed_price, dtype=bool)
+    observed_volume = np.asarray(observed_volume, dtype=bool)
+    dates = df['date'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    keys = _series_keys(df, by)
+    price_sum, price_count = 0.0, 0
+    for key, index in pd.Series(keys).groupby(keys, sort=False).indices.items():
+        observed = bool(observed_price[index].any())
+        s = {'tail': prices[index][-depth:], 'last_date': dates[index][-1], 'observed': observed,
+             'pending': 0 if observed else len(index),
+             'prices': KLLSketch(rank_error).update(prices[index] if observed else []),
+             'volumes': KLLSketch(rank_error).update(volumes[index][observed_volume[index]])}
+        if observed:
+            price_sum += float(prices[index].sum())
+            price_count += len(index)
+        _save_series(state_dir, key, s)
+    np.savez(os.path.join(state_dir, GLOBAL_FILE),
+             **_sketch_arrays('volumes', KLLSketch(rank_error).update(volumes[observed_volume])))
+    with open(input_path, 'rb') as f:
+        header = f.readline().decode('utf-8').rstrip('\r\n')
+        f.seek(0, os.SEEK_END)
+        offset = f.tell()
+    # The price totals cover the rows of series that have had a close; their
+    # mean fills the closes of series that have not
+    state = {'input_offset': offset, 'header': header, 'horizons': list(horizons), 'ticker': by,
+             'rank_error': rank_error, 'price_sum': price_sum, 'price_count': price_count}
+    with open(os.path.join(state_dir, STATE_FILE), 'w') as f:
+        json.dump(state, f, indent=2)
+
+
+def update_incremental(input_path, output_path, state_dir):
+    """
+    Process only the rows appended to input_path since the last run and
+    append their features to output_path (CSV), under the point-in-time
+    contract above. Each series' new rows must be dated on or after its last
+    processed date. Returns the new rows.
+    """
+    with open(os.path.join(state_dir, STATE_FILE)) as f:
+        state = json.load(f)
+    by, horizons, rank_error = state['ticker'], state['horizons'], state['rank_error']
+    with open(input_path, 'rb') as f:
+        f.seek(state['input_offset'])
+        appended = f.read()
+    if not appended.strip():
+        return None
+    header = (state['header'] + '\n').encode('utf-8')
+    batch = sort_series(read_dataset(io.BytesIO(header + appended), 'financial_data'), by)
+
+    keys = _series_keys(batch, by)
+    series = {key: _load_series(state_dir, key, rank_error) for key in pd.unique(keys)}
+    batch_dates = batch['date'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    first_date = pd.Series(batch_dates).groupby(keys, sort=False).min()
+    late = [key for key, date in first_date.items() if date < series[key]['last_date']]
+    if late:
+        raise ValueError(f"Appended rows predate already processed rows for {late[:5]}; "
+                         "run a full recompute instead")
+    with np.load(os.path.join(state_dir, GLOBAL_FILE)) as stored:
+        all_volumes = _load_sketch(stored, 'volumes', rank_error)
+
+    raw_prices = batch['closing_price'].to_numpy(dtype=float)
+    volumes = batch['volume'].to_numpy(dtype=float).copy()
+    prices = np.full(len(batch), np.nan)
+    contexts = {}
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    segments = [(int(start), int(stop)) for start, stop in zip(starts, np.r_[starts[1:], len(keys)])]
+
+    # Pass 1: fill closes and fold the new values into the sketches and
+    # totals, which the fills and bounds of pass 2 need in full
+    for start, stop in segments:
+        s = series[keys[start]]
+        raw = raw_prices[start:stop]
+        contexts[keys[start]] = s['tail']
+        if s['observed']:
+            prices[start:stop] = pd.Series(np.r_[s['tail'][-1], raw]).ffill().to_numpy()[1:]
+        elif not np.isnan(raw).all():
+            # The series' first close back-fills every row before it
+            first = raw[~np.isnan(raw)][0]
+            prices[start:stop] = pd.Series(raw).ffill().bfill().to_numpy()
+            contexts[keys[start]] = np.full(len(s['tail']), first)
+            s['prices'].update(np.full(s['pending'], first))
+            state['price_sum'] += s['pending'] * float(first)
+            state['price_count'] += s['pending']
+            s['observed'], s['pending'] = True, 0
+        if s['observed']:
+            s['prices'].update(prices[start:stop])
+            state['price_sum'] += float(prices[start:stop].sum())
+            state['price_count'] += stop - start
+        else:
+            s['pending'] += stop - start
+        observed = volumes[start:stop][~np.isnan(volumes[start:stop])]
+        s['volumes'].update(observed)
+        all_volumes.update(observed)
+
+    # Pass 2: mean fills, returns, volume fills and outlier bounds
+    mean = state['price_sum'] / state['price_count'] if state['price_count'] else np.nan
+    overall_median = _median(all_volumes)
+    lower = np.empty(len(batch))
+    upper = np.empty(len(batch))
+    returns = {h: np.empty(len(batch)) for h in horizons}
+    for start, stop in segments:
+        key = keys[start]
+        s = series[key]
+        context = contexts[key]
+        if not s['observed']:
+            # No close yet: every row of the series holds the run-wide mean,
+            # so its returns are 0 and nothing is an outlier
+            prices[start:stop] = mean
+            context = np.full(len(context), mean)
+            lower[start:stop], upper[start:stop] = mean, mean
+        else:
+            lower[start:stop], upper[start:stop] = _outlier_bounds(s['prices'], by is not None)
+        for h, values in _lag_returns(context, prices[start:stop], horizons).items():
+            returns[h][start:stop] = values
+        missing = np.isnan(volumes[start:stop])
+        median = _median(s['volumes']) if s['volumes'].count else overall_median
+        volumes[start:stop][missing] = median
+        s['tail'] = np.concatenate([context, prices[start:stop]])[-max(horizons):]
+        s['last_date'] = batch_dates[stop - 1]
+
+    batch['closing_price'] = prices
+    batch['volume'] = volumes
+    for h in horizons:
+        batch[f'return_{h}day'] = returns[h]
+    batch['volume_log'] = np.log1p(batch['volume'])
+    batch['is_outlier'] = ((prices < lower) | (prices > upper)).astype(int)
+
+    batch.to_csv(output_path, mode='a', header=False, index=False)
+    for key, s in series.items():
+        _save_series(state_dir, key, s)
+    np.savez(os.path.join(state_dir, GLOBAL_FILE), **_sketch_arrays('volumes', all_volumes))
+    state['input_offset'] += len(appended)
+    with open(os.path.join(state_dir, STATE_FILE), 'w') as f:
+        json.dump(state, f, indent=2)
+    return batch
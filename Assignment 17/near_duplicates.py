@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+# Near-duplicate detection for short texts using MinHash signatures and a
+# banded locality-sensitive hashing (LSH) index. Each post is compared only
+# with the earlier posts that share at least one band bucket, so the work
+# grows roughly linearly with the number of posts instead of quadratically.
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def optimal_bands(threshold, num_perm):
+    """
+    Pick the number of bands and rows per band whose LSH S-curve best
+    matches the Jaccard threshold, weighing false positives and false
+    negatives equally.
+    """
+    similarity = np.linspace(0, 1, 1001)
+    step = similarity[1]
+    below = similarity <= threshold
+    best, best_error = (1, num_perm), float('inf')
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            candidate = 1 - (1 - similarity ** rows) ** bands
+            false_positive = candidate[below].sum() * step
+            false_negative = (1 - candidate[~below]).sum() * step
+            if false_positive + false_negative < best_error:
+                best, best_error = (bands, rows), false_positive + false_negative
+    return best
+
+
+class NearDuplicateIndex:
+    """
+    Incremental MinHash/LSH index over cleaned texts.
+
+    Texts are fed in arrival order (one frame or many chunks). A text whose
+    estimated Jaccard similarity to an earlier kept text reaches the
+    threshold is reported as a duplicate of the most similar such text;
+    otherwise it becomes a new cluster representative. Only representatives
+    are stored: their signature and one bucket entry per band. Each bucket
+    lists up to bucket_size representatives (the first to arrive), and every
+    one of them is verified against the signature.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=64, shingle_size=1, seed=1, bucket_size=8):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bucket_size = bucket_size
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+        rng = np.random.default_rng(seed)
+        # Hash permutations (a * x + b) mod p; a, b and x below 2**32 keep the
+        # product inside uint64 without overflow
+        self.a = rng.integers(1, MAX_HASH, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MAX_HASH, num_perm, dtype=np.uint64)
+        self.buckets = [{} for _ in range(self.bands)]
+        self.signatures = {}
+
+    def _shingles(self, texts):
+        """Split texts into word shingles of shingle_size words."""
+        words = texts.fillna('').astype(str).str.split()
+        k = self.shingle_size
+        if k == 1:
+            return words
+        return words.map(lambda w: [' '.join(w[i:i + k]) for i in range(len(w) - k + 1)]
+                         or ([' '.join(w)] if w else []))
+
+    def signatures_for(self, texts, block_rows=10000):
+        """
+        Compute MinHash signatures for a column of texts, block by block.
+        Also returns a mask of the rows that have at least one shingle.
+        """
+        shingles = self._shingles(texts).reset_index(drop=True)
+        signatures = np.full((len(shingles), self.num_perm), MAX_HASH, dtype=np.uint64)
+        has_shingles = shingles.str.len().to_numpy() > 0
+        for start in range(0, len(shingles), block_rows):
+            block = shingles.iloc[start:start + block_rows].explode().dropna()
+            if block.empty:
+                continue
+            positions = block.index.to_numpy()
+            hashes = pd.util.hash_array(block.to_numpy(dtype=object)) & MAX_HASH
+            permuted = (hashes[:, None] * self.a + self.b) % MERSENNE_PRIME & MAX_HASH
+            # Shingles of one post are contiguous after explode, so a single
+            # reduceat takes the per-post minimum for every permutation
+            starts = np.flatnonzero(np.r_[True, positions[1:] != positions[:-1]])
+            signatures[positions[starts]] = np.minimum.reduceat(permuted, starts, axis=0)
+        return signatures.astype(np.uint32), has_shingles
+
+    def _band_keys(self, signatures):
+        """Hash each band of every signature to a single integer key."""
+        keys = np.zeros((len(signatures), self.bands), dtype=np.uint64)
+        for band in range(self.bands):
+            for column in range(band * self.rows, (band + 1) * self.rows):
+                keys[:, band] = keys[:, band] * np.uint64(1099511628211) ^ signatures[:, column]
+        return keys
+
+    def add(self, texts, ids):
+        """
+        Feed a batch of texts with their ids. Returns a frame aligned with
+        texts: duplicate_of holds the id of the earlier near-duplicate (or
+        None) and similarity its estimated Jaccard similarity.
+        """
+        signatures, has_shingles = self.signatures_for(texts)
+        keys = self._band_keys(signatures).tolist()
+        duplicate_of = [None] * len(signatures)
+        similarity = np.full(len(signatures), np.nan)
+        for i, post_id in enumerate(ids.tolist()):
+            if not has_shingles[i]:
+                continue
+            candidates = []
+            for band, key in enumerate(keys[i]):
+                candidates.extend(self.buckets[band].get(key, ()))
+            if candidates:
+                # A representative sharing several bands is verified once
+                candidates = list(dict.fromkeys(candidates))
+                stored = np.array([self.signatures[candidate] for candidate in candidates])
+                estimates = (stored == signatures[i]).mean(axis=1)
+                best = estimates.argmax()
+                if estimates[best] >= self.threshold:
+                    duplicate_of[i] = candidates[best]
+                    similarity[i] = estimates[best]
+            if duplicate_of[i] is None:
+                self.signatures[post_id] = signatures[i].copy()
+                for band, key in enumerate(keys[i]):
+                    bucket = self.buckets[band].setdefault(key, [])
+                    if len(bucket) < self.bucket_size:
+                        bucket.append(post_id)
+        return pd.DataFrame({'duplicate_of': pd.Series(duplicate_of, dtype=object, index=texts.index),
+                             'similarity': similarity}, index=texts.index)
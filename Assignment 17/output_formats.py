@@ -0,0 +1,101 @@
+import os
+
+import pandas as pd
+
+# Output writers shared by the Assignment 17 pipelines. CSV stays the default;
+# 'parquet' and 'feather' (Arrow IPC) keep real dtypes - categories, compact
+# integers and native timestamps - so downstream jobs skip text parsing.
+# The columnar formats need pyarrow, which is only imported when used.
+
+OUTPUT_FORMATS = {'csv': '.csv', 'parquet': '.parquet', 'feather': '.feather'}
+
+
+def output_path(path, output_format):
+    """Swap the extension of path for the one matching output_format."""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {output_format!r}; "
+                         f"expected one of {sorted(OUTPUT_FORMATS)}")
+    return os.path.splitext(path)[0] + OUTPUT_FORMATS[output_format]
+
+
+class TableWriter:
+    """
+    Write a frame, or a sequence of chunks, to CSV, Parquet or Feather.
+
+    dtypes maps column names to the dtype they should be stored with in the
+    columnar formats ('category', 'int32', ...). Categories are kept in one
+    append-only list per column, so every chunk shares the same dictionary
+    (later chunks only extend it). csv_options are passed to to_csv.
+    """
+
+    def __init__(self, path, output_format='csv', dtypes=None, **csv_options):
+        self.path = output_path(path, output_format)
+        self.output_format = output_format
+        self.dtypes = dtypes or {}
+        self.csv_options = csv_options
+        self.categories = {}
+        self.schema = None
+        self.writer = None
+        self.sink = None
+        self.chunks_written = 0
+
+    def _apply_dtypes(self, df):
+        df = df.copy()
+        for column, dtype in self.dtypes.items():
+            if column not in df.columns:
+                continue
+            if dtype == 'category':
+                known = self.categories.setdefault(column, [])
+                seen = set(known)
+                known.extend(value for value in pd.unique(df[column].dropna()) if value not in seen)
+                df[column] = pd.Categorical(df[column], categories=known)
+            else:
+                df[column] = df[column].astype(dtype)
+        return df
+
+    def _open_columnar(self, table):
+        import pyarrow as pa
+        # Fix dictionary indices at int32 so later chunks with more
+        # categories still match the schema of the first one
+        fields = [pa.field(field.name, pa.dictionary(pa.int32(), field.type.value_type))
+                  if pa.types.is_dictionary(field.type) else field
+                  for field in table.schema]
+        self.schema = pa.schema(fields, metadata=table.schema.metadata)
+        if self.output_format == 'parquet':
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        else:
+            import pyarrow.ipc as ipc
+            self.sink = pa.OSFile(self.path, 'wb')
+            # lz4 matches the compression pyarrow uses for Feather by default
+            options = ipc.IpcWriteOptions(compression='lz4', emit_dictionary_deltas=True)
+            self.writer = ipc.new_file(self.sink, self.schema, options=options)
+
+    def write(self, df):
+        if self.output_format == 'csv':
+            first = self.chunks_written == 0
+            df.to_csv(self.path, index=False, header=first, mode='w' if first else 'a',
+                      **self.csv_options)
+        else:
+            import pyarrow as pa
+            table = pa.Table.from_pandas(self._apply_dtypes(df), preserve_index=False)
+            if self.writer is None:
+                self._open_columnar(table)
+            # Pandas string columns can arrive as many small Arrow chunks;
+            # combining them avoids writing one tiny record batch per chunk
+            self.writer.write_table(table.cast(self.schema).combine_chunks())
+        self.chunks_written += 1
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        if self.sink is not None:
+            self.sink.close()
+
+
+def write_table(df, path, output_format='csv', dtypes=None, **csv_options):
+    """Write a whole frame in one go; returns the path actually written."""
+    writer = TableWriter(path, output_format, dtypes, **csv_options)
+    writer.write(df)
+    writer.close()
+    return writer.path
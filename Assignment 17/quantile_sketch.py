@@ -0,0 +1,125 @@
+import math
+
+import numpy as np
+
+# Mergeable streaming quantiles (KLL sketch, Karnin-Lang-Liberty 2016).
+# Values go into level 0; when a level overflows it is sorted and every other
+# item (random offset) moves up one level with twice the weight. Level
+# capacities shrink geometrically towards the bottom, so memory stays
+# O(k log(n / k)) for n values, and two sketches merge by concatenating
+# their levels and compacting again.
+
+
+def k_for_rank_error(rank_error):
+    """Smallest k whose typical normalized rank error is at most rank_error."""
+    # Empirical single-quantile bound from the KLL reference implementation
+    # (Apache DataSketches): error ~= 2.296 / k ** 0.9723
+    return max(8, math.ceil((2.296 / rank_error) ** (1 / 0.9723)))
+
+
+class KLLSketch:
+    """
+    Approximate quantiles of a stream of floats.
+
+    A quantile q returned by the sketch has a true rank within about
+    rank_error * n of q * n. Until more than k values have been added the
+    sketch holds every value and its quantiles are exact (linear
+    interpolation, as in Series.quantile). NaN values are ignored.
+    """
+
+    def __init__(self, rank_error=0.001, seed=None):
+        self.rank_error = rank_error
+        self.k = k_for_rank_error(rank_error)
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - 1 - level
+        return max(8, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind so total weight is preserved
+                leftover, items = items[:len(items) % 2], items[len(items) % 2:]
+                promoted = items[self.rng.integers(2)::2]
+                self.levels[level] = leftover
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                # Adding a level shrinks the capacity of every level below it
+                level = 0
+                continue
+            level += 1
+
+    def update(self, values):
+        """Add an array of values."""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.count += len(values)
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Fold another sketch (e.g. from a parallel worker) into this one."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """Estimate one quantile, or an array of them; NaN when empty."""
+        qs = np.atleast_1d(np.asarray(q, dtype=float))
+        if self.count == 0:
+            result = np.full(len(qs), np.nan)
+        else:
+            items = np.concatenate(self.levels)
+            weights = np.concatenate([np.full(len(items), 2 ** level, dtype=np.int64)
+                                      for level, items in enumerate(self.levels)])
+            order = np.argsort(items, kind='stable')
+            items, cumulative = items[order], np.cumsum(weights[order])
+            # Interpolate between the items holding the two ranks around q * (n - 1)
+            position = qs * (self.count - 1)
+            lower = np.floor(position)
+            below = items[np.searchsorted(cumulative, lower, side='right')]
+            above = items[np.minimum(np.searchsorted(cumulative, lower + 1, side='right'),
+                                     len(items) - 1)]
+            result = below + (above - below) * (position - lower)
+        return result if np.ndim(q) else result[0]
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def exact(self):
+        """Whether the sketch still holds every value it was given (level 0 only)."""
+        return len(self.levels) == 1
+
+    def to_arrays(self):
+        """The levels as (items, level sizes) arrays, e.g. for np.savez."""
+        return np.concatenate(self.levels), np.array([len(items) for items in self.levels])
+
+    @classmethod
+    def from_arrays(cls, items, sizes, rank_error=0.001, seed=None):
+        """Rebuild a sketch saved with to_arrays."""
+        sketch = cls(rank_error, seed)
+        bounds = np.cumsum(np.r_[0, sizes])
+        sketch.levels = [np.asarray(items[start:end], dtype=float)
+                         for start, end in zip(bounds[:-1], bounds[1:])] or [np.empty(0)]
+        sketch.count = int(sum(len(items) * 2 ** level for level, items in enumerate(sketch.levels)))
+        return sketch
+
+    @property
+    def retained(self):
+        """Number of values currently stored."""
+        return sum(len(items) for items in self.levels)
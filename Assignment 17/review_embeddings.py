@@ -0,0 +1,84 @@
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+
+# Dense, fixed-width review embeddings from the sparse TF-IDF rows. A
+# randomized TruncatedSVD is fitted on a random sample of rows (the
+# components of a large corpus settle long before every row is seen), and
+# rows are then projected onto the components batch by batch as float32,
+# so the transform never holds more than one batch. The explained variance
+# of the sample tells how much of the TF-IDF signal the k dimensions keep.
+
+
+class TfidfReducer:
+    """
+    Reduce TF-IDF rows to k float32 dimensions with TruncatedSVD fitted on
+    up to sample_size rows.
+    """
+
+    def __init__(self, k=100, sample_size=100_000, seed=0):
+        self.k = k
+        self.sample_size = sample_size
+        self.seed = seed
+        self.svd = None
+        self.components = None
+
+    def fit(self, matrix):
+        """Fit on a random sample of the rows of matrix (CSR)."""
+        rng = np.random.default_rng(self.seed)
+        if matrix.shape[0] > self.sample_size:
+            rows = np.sort(rng.choice(matrix.shape[0], self.sample_size, replace=False))
+            matrix = matrix[rows]
+        # TruncatedSVD needs fewer components than features
+        k = max(1, min(self.k, matrix.shape[1] - 1, matrix.shape[0]))
+        self.svd = TruncatedSVD(n_components=k, algorithm='randomized', random_state=self.seed).fit(matrix)
+        self.components = np.ascontiguousarray(self.svd.components_.T, dtype=np.float32)
+        return self
+
+    @property
+    def explained_variance(self):
+        """Share of the sample's variance kept by the components."""
+        return float(self.svd.explained_variance_ratio_.sum())
+
+    def columns(self):
+        return [f'svd_{i}' for i in range(self.components.shape[1])]
+
+    def transform(self, matrix):
+        """Embeddings (float32 array, one row per row of matrix)."""
+        return matrix.astype(np.float32) @ self.components
+
+    def transform_batches(self, matrix, batch_size=100_000):
+        """Yield the embeddings of matrix batch_size rows at a time."""
+        for start in range(0, matrix.shape[0], batch_size):
+            yield self.transform(matrix[start:start + batch_size])
+
+
+class ReservoirSample:
+    """
+    Uniform random sample of up to `size` items from a stream of batches
+    (reservoir sampling, one vectorized draw per batch), for fitting a
+    TfidfReducer in a single pass over data that does not fit in memory.
+    """
+
+    def __init__(self, size, seed=0):
+        self.size = size
+        self.seen = 0
+        self.items = np.empty(0, dtype=object)
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=object)
+        # Fill the reservoir first
+        free = min(self.size - len(self.items), len(values))
+        if free > 0:
+            self.items = np.concatenate([self.items, values[:free]])
+        # Item i (0-based) of the stream then replaces a random slot with
+        # probability size / (i + 1)
+        positions = self.seen + np.arange(free, len(values))
+        slots = self.rng.integers(0, positions + 1)
+        keep = slots < self.size
+        # Of several items drawing the same slot, the last one stays
+        slots, replacements = slots[keep][::-1], values[free:][keep][::-1]
+        slots, last = np.unique(slots, return_index=True)
+        self.items[slots] = replacements[last]
+        self.seen += len(values)
+        return self
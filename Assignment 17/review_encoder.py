@@ -0,0 +1,212 @@
+import glob
+import itertools
+import os
+import re
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from text_normalization import standardize_text_series
+
+# Fitted state of the Task-4 review encoding - the TF-IDF vectorizer, the
+# rating scaler and the median used to fill missing ratings - saved once and
+# reused to encode new reviews without refitting. Each save writes a new
+# numbered artifact (encoder-v0001.joblib, encoder-v0002.joblib, ...) in the
+# encoder directory, so earlier models stay loadable; loading picks the
+# newest unless a version is given.
+#
+# With a fixed vocabulary, transforming does not need every n-gram of every
+# review - which is where TfidfVectorizer.transform spends its time, one
+# Python call per review. For word unigram/bigram vectorizers the encoder
+# tokenizes the whole batch at once with the vectorizer's own token pattern
+# and stop words (distinct whitespace-separated pieces are tokenized once),
+# and looks unigrams and adjacent pairs up in the vocabulary with array
+# operations; the weights are the vectorizer's own (idf_, sublinear_tf,
+# norm). Other vectorizers use their transform().
+
+FORMAT_VERSION = 1
+ARTIFACT_PATTERN = re.compile(r'encoder-v(\d+)\.joblib$')
+# Marks the end of each text when a batch is tokenized as one string
+SEPARATOR = '\x01'
+
+
+class ReviewEncoder:
+    """
+    Encode reviews (review_id, review_text, rating) with fitted state: the
+    standardized text, the filled and scaled rating, and TF-IDF rows.
+    vectorizer is a fitted TfidfVectorizer or StreamingTfidf; reducer, if
+    given, a fitted review_embeddings.TfidfReducer.
+    """
+
+    # Artifacts saved before reducers existed load without one
+    reducer = None
+
+    def __init__(self, vectorizer, scaler, median_rating, reducer=None):
+        self.vectorizer = vectorizer
+        self.scaler = scaler
+        self.median_rating = median_rating
+        self.reducer = reducer
+        self._lookup = _vocabulary_lookup(vectorizer) if _vectorizable(vectorizer) else None
+
+    def encode(self, reviews, workers=1):
+        """Return (table, TF-IDF CSR matrix) for a batch of reviews."""
+        standardized = standardize_text_series(reviews['review_text'], workers=workers)
+        rating = reviews['rating'].fillna(self.median_rating)
+        table = pd.DataFrame({
+            'review_id': reviews['review_id'],
+            'review_text': reviews['review_text'],
+            'review_text_standardized': standardized,
+            'rating_original': rating,
+            'rating': self.scaler.transform(rating.to_frame('rating'))[:, 0],
+        })
+        if self._lookup is None:
+            return table, self.vectorizer.transform(standardized)
+        return table, _vocabulary_transform(self.vectorizer, self._lookup, standardized)
+
+    def feature_names(self):
+        """Vocabulary of the vectorizer, or None for hashed features."""
+        if hasattr(self.vectorizer, 'get_feature_names_out'):
+            return self.vectorizer.get_feature_names_out()
+        return None
+
+
+def _vectorizable(vectorizer):
+    """Whether _vocabulary_transform reproduces vectorizer.transform."""
+    return (isinstance(vectorizer, TfidfVectorizer) and hasattr(vectorizer, 'vocabulary_')
+            and vectorizer.analyzer == 'word' and vectorizer.tokenizer is None
+            and vectorizer.preprocessor is None and vectorizer.strip_accents is None
+            and vectorizer.token_pattern is not None and vectorizer.ngram_range[1] <= 2)
+
+
+def _vocabulary_lookup(vectorizer):
+    """
+    Index of every vocabulary word followed by the stop words, the unigram
+    column of each word, and the sorted (first word, second word) keys of
+    the bigram columns.
+    """
+    words = sorted({word for term in vectorizer.vocabulary_ for word in term.split(' ')})
+    unigram = np.full(len(words), -1, dtype=np.int64)
+    index = pd.Index(words)
+    keys, columns = [], []
+    for term, column in vectorizer.vocabulary_.items():
+        parts = index.get_indexer(term.split(' '))
+        if len(parts) == 1:
+            unigram[parts[0]] = column
+        else:
+            keys.append(parts[0] * len(words) + parts[1])
+            columns.append(column)
+    # Stop words never reach the vocabulary, so the two lists are disjoint
+    stop_words = sorted(set(vectorizer.get_stop_words() or ()) - set(words))
+    order = np.argsort(keys)
+    return (pd.Index(words + stop_words), len(words), unigram,
+            np.asarray(keys, dtype=np.int64)[order], np.asarray(columns, dtype=np.int64)[order])
+
+
+def _word_ids(texts, pattern, lowercase, lookup):
+    """
+    Position in lookup of every token of texts, in order (-1 for words
+    outside the vocabulary, stop words dropped), and the text it belongs to.
+    The batch is split on whitespace as one string and the token pattern only
+    runs once per distinct piece.
+    """
+    index, n_words = lookup[0], lookup[1]
+    joined = f' {SEPARATOR} '.join(texts)
+    if lowercase:
+        joined = joined.lower()
+    codes, pieces = pd.factorize(np.array(joined.split(), dtype=object))
+    is_separator = (pieces == SEPARATOR)
+    if is_separator[codes].sum() != max(len(texts) - 1, 0):
+        # A text contains the separator itself; it only separates tokens
+        return _word_ids([text.replace(SEPARATOR, ' ') for text in texts], pattern, lowercase, lookup)
+    tokens = [pattern.findall(piece) for piece in pieces]
+    lengths = np.array([len(found) for found in tokens], dtype=np.int64)
+    ids = index.get_indexer(list(itertools.chain.from_iterable(tokens)))
+    ids[ids >= n_words] = -2
+    starts = np.cumsum(lengths) - lengths
+
+    counts = lengths[codes]
+    offsets = np.cumsum(counts) - counts
+    positions = np.repeat(starts[codes] - offsets, counts) + np.arange(counts.sum())
+    ids = ids[positions]
+    docs = np.repeat(np.cumsum(is_separator[codes]), counts)
+    keep = ids != -2
+    return ids[keep], docs[keep]
+
+
+def _vocabulary_transform(vectorizer, lookup, texts):
+    """TF-IDF rows of texts over the fitted vocabulary, as vectorizer.transform."""
+    _, n_words, unigram, bigram_keys, bigram_columns = lookup
+    texts = [text if isinstance(text, str) else '' for text in texts]
+    ids, docs = _word_ids(texts, re.compile(vectorizer.token_pattern), vectorizer.lowercase, lookup)
+
+    rows, columns = [], []
+    if vectorizer.ngram_range[0] <= 1:
+        column = np.where(ids >= 0, unigram[np.maximum(ids, 0)], -1)
+        rows.append(docs[column >= 0])
+        columns.append(column[column >= 0])
+    if vectorizer.ngram_range[1] == 2 and len(bigram_keys):
+        # Unknown words (-1) sit between their neighbours and break pairs
+        pair = (docs[1:] == docs[:-1]) & (ids[1:] >= 0) & (ids[:-1] >= 0)
+        key = ids[:-1][pair] * n_words + ids[1:][pair]
+        position = np.minimum(np.searchsorted(bigram_keys, key), len(bigram_keys) - 1)
+        found = bigram_keys[position] == key
+        rows.append(docs[:-1][pair][found])
+        columns.append(bigram_columns[position[found]])
+    rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+    columns = np.concatenate(columns) if columns else np.empty(0, dtype=np.int64)
+
+    counts = sparse.csr_matrix((np.ones(len(rows)), (rows, columns)),
+                               shape=(len(texts), len(vectorizer.vocabulary_)))
+    counts.sum_duplicates()
+    if vectorizer.binary:
+        counts.data[:] = 1
+    if vectorizer.sublinear_tf:
+        np.log(counts.data, out=counts.data)
+        counts.data += 1
+    if vectorizer.use_idf:
+        counts.data *= vectorizer.idf_[counts.indices]
+    if vectorizer.norm:
+        counts = normalize(counts, norm=vectorizer.norm, copy=False)
+    return counts.astype(vectorizer.dtype, copy=False)
+
+
+def _versions(directory):
+    versions = {}
+    for path in glob.glob(os.path.join(directory, 'encoder-v*.joblib')):
+        match = ARTIFACT_PATTERN.search(path)
+        if match:
+            versions[int(match.group(1))] = path
+    return versions
+
+
+def save_encoder(encoder, directory):
+    """Save encoder as the next version in directory; returns (version, path)."""
+    os.makedirs(directory, exist_ok=True)
+    version = max(_versions(directory), default=0) + 1
+    path = os.path.join(directory, f'encoder-v{version:04d}.joblib')
+    joblib.dump({'format': FORMAT_VERSION, 'version': version,
+                 'created': pd.Timestamp.now().isoformat(timespec='seconds'),
+                 'sklearn': sklearn.__version__, 'encoder': encoder}, path)
+    return version, path
+
+
+def load_encoder(directory, version=None):
+    """Load the given version (the newest when None) from directory."""
+    versions = _versions(directory)
+    if not versions:
+        raise FileNotFoundError(f"No encoder artifacts in {directory}")
+    if version is None:
+        version = max(versions)
+    if version not in versions:
+        raise FileNotFoundError(f"No encoder version {version} in {directory}; "
+                                f"available: {sorted(versions)}")
+    artifact = joblib.load(versions[version])
+    if artifact.get('format') != FORMAT_VERSION:
+        raise ValueError(f"{versions[version]} has artifact format {artifact.get('format')}, "
+                         f"expected {FORMAT_VERSION}")
+    return artifact
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Top-k similar-review search over L2-normalized TF-IDF rows, where cosine
+# similarity is a dot product. The index is an inverted index: the
+# transposed matrix in CSR form holds, for every term, the reviews it occurs
+# in and their weights. A batch of queries times the postings is a sparse
+# product that only visits the postings of the terms the queries contain,
+# so reviews sharing no term with a query cost nothing.
+#
+# Very common terms have postings covering most reviews, so queries are
+# scored in groups sized by the postings entries they visit, which keeps
+# the score matrix of a batch bounded.
+#
+# Added reviews go into a new block with its own postings; once there are
+# more than max_blocks blocks they are merged into one, so adding stays
+# cheap and queries touch a bounded number of blocks.
+
+
+class ReviewSearchIndex:
+    """
+    Incremental cosine top-k index over sparse TF-IDF rows (CSR, one row per
+    review, L2-normalized as TfidfVectorizer and StreamingTfidf produce).
+    """
+
+    def __init__(self, max_blocks=8):
+        self.max_blocks = max_blocks
+        self.blocks = []
+        self.ids = np.empty(0, dtype=np.int64)
+        # Rebuilt after adds: id -> position, all rows as one matrix, and
+        # the number of reviews containing each term
+        self._position = None
+        self._rows = None
+        self._counts = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, matrix, ids):
+        """Add TF-IDF rows with their review ids."""
+        matrix = sparse.csr_matrix(matrix)
+        if matrix.shape[0] != len(ids):
+            raise ValueError(f"Got {matrix.shape[0]} rows but {len(ids)} ids")
+        if self.blocks and matrix.shape[1] != self.blocks[0][0].shape[1]:
+            raise ValueError(f"Rows have {matrix.shape[1]} features, the index "
+                             f"{self.blocks[0][0].shape[1]}")
+        self.blocks.append((matrix, matrix.T.tocsr()))
+        ids = np.asarray(ids)
+        self.ids = ids.copy() if not len(self.ids) else np.concatenate([self.ids, ids])
+        self._position = self._rows = self._counts = None
+        if len(self.blocks) > self.max_blocks:
+            rows = sparse.vstack([block for block, _ in self.blocks]).tocsr()
+            self.blocks = [(rows, rows.T.tocsr())]
+        return self
+
+    def vectors(self, ids):
+        """Stored rows of the given review ids, in that order."""
+        if self._position is None:
+            self._position = pd.Index(self.ids)
+        positions = self._position.get_indexer(list(ids))
+        if (positions < 0).any():
+            missing = [review_id for review_id, p in zip(ids, positions) if p < 0]
+            raise KeyError(f"Review ids not in the index: {missing[:10]}")
+        if self._rows is None:
+            self._rows = sparse.vstack([block for block, _ in self.blocks]).tocsr()
+        return self._rows[positions], positions
+
+    def _term_counts(self):
+        """Number of indexed reviews containing each term."""
+        if self._counts is None:
+            self._counts = sum(np.diff(postings.indptr) for _, postings in self.blocks)
+        return self._counts
+
+    def search(self, queries, k=10, exclude=None, work_budget=20_000_000):
+        """
+        Top-k reviews by cosine similarity for every row of queries (CSR).
+        exclude optionally gives, per query, an index position to skip (-1
+        for none). Queries are scored in groups visiting about work_budget
+        postings entries at a time. Returns a frame of query (row number),
+        rank, review_id and score; queries with fewer than k matching
+        reviews get fewer rows.
+        """
+        queries = sparse.csr_matrix(queries)
+        if not self.blocks or not queries.shape[0]:
+            return pd.DataFrame({'query': np.empty(0, dtype=np.int64), 'rank': np.empty(0, dtype=np.int64),
+                                 'review_id': self.ids[:0], 'score': np.empty(0)})
+        # Postings entries each query visits: the review counts of its terms
+        present = sparse.csr_matrix((np.ones(queries.nnz), queries.indices, queries.indptr), queries.shape)
+        work = present @ self._term_counts()
+        group = np.cumsum(work) // max(work_budget, 1)
+        bounds = np.r_[0, np.flatnonzero(np.diff(group)) + 1, queries.shape[0]]
+
+        query_rows, positions, values = [], [], []
+        for first, last in zip(bounds[:-1], bounds[1:]):
+            scores = sparse.hstack([queries[first:last] @ postings for _, postings in self.blocks]).tocsr()
+            scores.eliminate_zeros()
+            if exclude is not None:
+                row_of_entry = np.repeat(np.arange(scores.shape[0]), np.diff(scores.indptr))
+                scores.data[scores.indices == np.asarray(exclude)[first:last][row_of_entry]] = 0
+                scores.eliminate_zeros()
+            for row in range(scores.shape[0]):
+                start, end = scores.indptr[row], scores.indptr[row + 1]
+                data, columns = scores.data[start:end], scores.indices[start:end]
+                if end - start > k:
+                    top = np.argpartition(-data, k - 1)[:k]
+                    data, columns = data[top], columns[top]
+                # Best first; equal scores in index order
+                order = np.lexsort((columns, -data))
+                query_rows.append(np.full(len(order), first + row))
+                positions.append(columns[order])
+                values.append(data[order])
+        query_rows = np.concatenate(query_rows)
+        positions = np.concatenate(positions)
+        ranks = np.arange(len(query_rows)) - np.searchsorted(query_rows, query_rows)
+        return pd.DataFrame({'query': query_rows, 'rank': ranks + 1,
+                             'review_id': self.ids[positions], 'score': np.concatenate(values)})
+
+    def similar_to(self, ids, k=10):
+        """Top-k other reviews most similar to each of the given indexed reviews."""
+        vectors, positions = self.vectors(ids)
+        found = self.search(vectors, k, exclude=positions)
+        found.insert(0, 'source_id', np.asarray(list(ids))[found['query'].to_numpy()])
+        return found.drop(columns='query')
@@ -0,0 +1,163 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from dataset_schemas import read_dataset
+from output_formats import OUTPUT_FORMATS, write_table
+from sparse_encoding import category_codes
+
+# Partitioned on-disk layout for sensor readings:
+#
+#   <root>/_layout.json                    bucket count and file format
+#   <root>/date=2025-02-01/bucket=003/part.csv
+#   <root>/date=__null__/bucket=003/part.csv   unparseable timestamps (NaT)
+#
+# Readings are split by calendar day and by a hash of sensor_id into a fixed
+# number of buckets, and every partition is sorted by (timestamp, sensor_id).
+# Time-range and sensor filters are checked against the directory names
+# first, so only partitions that can hold matching rows are opened. Days are
+# disjoint and ordered, so a sorted result only needs the buckets of each day
+# merged: a stable argsort is a timsort, which merges presorted runs in
+# O(n log buckets) instead of re-sorting the whole table. Readings without a
+# timestamp come last, as NaT sorts in memory, and no time range matches
+# them.
+
+LAYOUT_FILE = '_layout.json'
+NULL_DAY = '__null__'
+
+
+def sensor_buckets(sensor_ids, buckets):
+    """Bucket number of every sensor id (stable across runs and machines)."""
+    values = np.asarray(sensor_ids, dtype=object).astype(str).astype(object)
+    return (pd.util.hash_array(values) % buckets).astype(np.int64)
+
+
+def _partition_dir(root, day, bucket):
+    day = NULL_DAY if pd.isna(day) else f'{day:%Y-%m-%d}'
+    return os.path.join(root, f'date={day}', f'bucket={bucket:03d}')
+
+
+def write_partitioned(df, root, buckets=16, output_format='csv', dtypes=None):
+    """
+    Write readings (timestamp, sensor_id, ...) to the partitioned layout under
+    root, replacing any partitions already there. Returns the partition count.
+    """
+    os.makedirs(root, exist_ok=True)
+    for entry in os.listdir(root):
+        if entry.startswith('date='):
+            shutil.rmtree(os.path.join(root, entry))
+    days = df['timestamp'].dt.floor('D')
+    codes, sensors = category_codes(df['sensor_id'])
+    bucket = sensor_buckets(sensors, buckets)[codes]
+    written = 0
+    # dropna=False keeps readings with a NaT timestamp (the NULL_DAY partition)
+    for (day, number), part in df.groupby([days, bucket], sort=True, dropna=False):
+        directory = _partition_dir(root, day, number)
+        os.makedirs(directory, exist_ok=True)
+        part = part.sort_values(['timestamp', 'sensor_id'], kind='stable')
+        write_table(part, os.path.join(directory, 'part.csv'), output_format, dtypes=dtypes)
+        written += 1
+    with open(os.path.join(root, LAYOUT_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'buckets': buckets, 'format': output_format}, f)
+    return written
+
+
+def select_partitions(root, start=None, end=None, sensors=None):
+    """
+    Partition files under root that can hold readings with start <= timestamp
+    < end from the given sensors (None means no limit), grouped by day in
+    date order: [(day, [paths])]. Readings without a timestamp (day None)
+    come last, and only without a time range.
+    """
+    with open(os.path.join(root, LAYOUT_FILE), encoding='utf-8') as f:
+        layout = json.load(f)
+    wanted = None
+    if sensors is not None:
+        wanted = set(sensor_buckets(list(sensors), layout['buckets']).tolist())
+    first_day = pd.Timestamp(start).floor('D') if start is not None else None
+    selected = []
+    entries = sorted(entry for entry in os.listdir(root) if entry.startswith('date='))
+    null_entry = f'date={NULL_DAY}'
+    if null_entry in entries:
+        entries.remove(null_entry)
+        if start is None and end is None:
+            entries.append(null_entry)
+    for entry in entries:
+        day = None if entry == null_entry else pd.Timestamp(entry[len('date='):])
+        if day is not None and ((first_day is not None and day < first_day)
+                                or (end is not None and day >= pd.Timestamp(end))):
+            continue
+        paths = []
+        for bucket_entry in sorted(os.listdir(os.path.join(root, entry))):
+            if wanted is not None and int(bucket_entry[len('bucket='):]) not in wanted:
+                continue
+            paths.append(os.path.join(root, entry, bucket_entry, 'part' + OUTPUT_FORMATS[layout['format']]))
+        if paths:
+            selected.append((day, paths))
+    return selected
+
+
+def _read_partition(path, name):
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    if path.endswith('.feather'):
+        return pd.read_feather(path)
+    return read_dataset(path, name)
+
+
+def merge_sorted(frames):
+    """Merge frames that are each sorted by (timestamp, sensor_id)."""
+    frames = [frame for frame in frames if len(frame)]
+    if len(frames) <= 1:
+        return frames[0].reset_index(drop=True) if frames else None
+    df = pd.concat(frames, ignore_index=True)
+    times = df['timestamp'].to_numpy().astype('datetime64[ns]').view(np.int64)
+    order = np.argsort(times, kind='stable')
+    # Equal timestamps from different partitions still need sensor order;
+    # only those rows are reordered
+    times = times[order]
+    tied = np.r_[False, times[1:] == times[:-1]]
+    tied[:-1] |= tied[1:]
+    if tied.any():
+        positions = np.flatnonzero(tied)
+        codes, _ = category_codes(df['sensor_id'].iloc[order[positions]].astype(str))
+        within = np.lexsort((codes, times[positions]))
+        order[positions] = order[positions][within]
+    return df.iloc[order].reset_index(drop=True)
+
+
+def iter_partitioned(root, name='iot_sensor', start=None, end=None, sensors=None):
+    """
+    Yield the readings of root matching the filters one day at a time, each
+    day merged into (timestamp, sensor_id) order.
+    """
+    if sensors is not None:
+        sensors = [str(sensor) for sensor in sensors]
+    for _, paths in select_partitions(root, start, end, sensors):
+        frames = []
+        for path in paths:
+            part = _read_partition(path, name)
+            keep = np.ones(len(part), dtype=bool)
+            if start is not None:
+                keep &= (part['timestamp'] >= pd.Timestamp(start)).to_numpy()
+            if end is not None:
+                keep &= (part['timestamp'] < pd.Timestamp(end)).to_numpy()
+            if sensors is not None:
+                keep &= part['sensor_id'].astype(str).isin(sensors).to_numpy()
+            frames.append(part[keep])
+        day = merge_sorted(frames)
+        if day is not None:
+            yield day
+
+
+def read_partitioned(root, name='iot_sensor', start=None, end=None, sensors=None):
+    """All matching readings of root as one frame sorted by (timestamp, sensor_id)."""
+    days = list(iter_partitioned(root, name, start, end, sensors))
+    if not days:
+        raise ValueError(f"No readings in {root} match the given time range and sensors")
+    df = pd.concat(days, ignore_index=True)
+    df['sensor_id'] = df['sensor_id'].astype('category')
+    return df
@@ -0,0 +1,109 @@
+import pandas as pd
+
+# Time-bucket rollups of sensor readings: count, sum, min, max and mean of
+# each field per sensor per bucket. Count, sum, min and max merge exactly, so
+# a coarser rollup (per hour) is derived from a finer one (per minute) without
+# going back to the readings, and partial rollups of consecutive chunks of a
+# stream merge the same way.
+
+FIELDS = ['temperature', 'humidity']
+
+
+def _check_frequency(freq):
+    try:
+        return pd.Timedelta(freq)
+    except ValueError:
+        raise ValueError(f"Rollup frequency {freq!r} must be a fixed duration such as '1min', '1h' or '1D'")
+
+
+def _finish(grouped, fields):
+    rollups = grouped.reset_index()
+    columns = ['sensor_id', 'bucket']
+    for field in fields:
+        rollups[f'{field}_mean'] = rollups[f'{field}_sum'] / rollups[f'{field}_count']
+        columns += [f'{field}_{stat}' for stat in ('count', 'sum', 'min', 'max', 'mean')]
+    return rollups[columns]
+
+
+def rollup(df, freq, fields=FIELDS):
+    """Roll readings (timestamp, sensor_id, fields) up into buckets of freq."""
+    _check_frequency(freq)
+    buckets = df['timestamp'].dt.floor(freq).rename('bucket')
+    aggregations = {}
+    for field in fields:
+        aggregations[f'{field}_count'] = (field, 'count')
+        aggregations[f'{field}_sum'] = (field, 'sum')
+        aggregations[f'{field}_min'] = (field, 'min')
+        aggregations[f'{field}_max'] = (field, 'max')
+    grouped = df.groupby([df['sensor_id'], buckets], observed=True, sort=True).agg(**aggregations)
+    return _finish(grouped, fields)
+
+
+def coarsen(rollups, freq, fields=FIELDS):
+    """
+    Merge rollups into buckets of freq, which must be a multiple of their
+    bucket size. Also merges duplicate buckets from separate chunks.
+    """
+    _check_frequency(freq)
+    buckets = rollups['bucket'].dt.floor(freq)
+    aggregations = {}
+    for field in fields:
+        aggregations[f'{field}_count'] = (f'{field}_count', 'sum')
+        aggregations[f'{field}_sum'] = (f'{field}_sum', 'sum')
+        aggregations[f'{field}_min'] = (f'{field}_min', 'min')
+        aggregations[f'{field}_max'] = (f'{field}_max', 'max')
+    grouped = rollups.groupby([rollups['sensor_id'], buckets], observed=True, sort=True).agg(**aggregations)
+    return _finish(grouped, fields)
+
+
+def multi_resolution(df, frequencies, fields=FIELDS):
+    """
+    Rollups for every frequency in frequencies (finest first, each a multiple
+    of the previous one). Only the finest reads the readings; each coarser
+    level is derived from the level before it. Returns {freq: rollups}.
+    """
+    durations = [_check_frequency(freq) for freq in frequencies]
+    for finer, coarser, freq in zip(durations, durations[1:], frequencies[1:]):
+        if coarser % finer:
+            raise ValueError(f"Rollup frequency {freq!r} is not a multiple of the one before it")
+    levels = {}
+    for i, freq in enumerate(frequencies):
+        levels[freq] = rollup(df, freq, fields) if i == 0 else coarsen(levels[frequencies[i - 1]], freq, fields)
+    return levels
+
+
+class RollupAccumulator:
+    """
+    Streaming rollups of time-ordered readings, or of finer rollups fed to a
+    coarser accumulator. update() merges a chunk into the open buckets and
+    returns the buckets that are complete: those ending at or before
+    `watermark`, the earliest timestamp any later input can still have.
+    """
+
+    def __init__(self, freq, fields=FIELDS):
+        _check_frequency(freq)
+        self.freq = freq
+        self.fields = list(fields)
+        self.open = None
+
+    def update(self, chunk, watermark=None):
+        if len(chunk):
+            part = (coarsen(chunk, self.freq, self.fields) if 'bucket' in chunk.columns
+                    else rollup(chunk, self.freq, self.fields))
+            if self.open is not None and len(self.open):
+                part = coarsen(pd.concat([self.open, part], ignore_index=True), self.freq, self.fields)
+            self.open = part
+        if self.open is None or watermark is None:
+            return self._empty()
+        complete = self.open['bucket'] < pd.Timestamp(watermark).floor(self.freq)
+        done, self.open = self.open[complete], self.open[~complete]
+        return done.sort_values(['bucket', 'sensor_id']).reset_index(drop=True)
+
+    def flush(self):
+        """Return every bucket still open."""
+        done = self.open if self.open is not None else self._empty()
+        self.open = None
+        return done.sort_values(['bucket', 'sensor_id']).reset_index(drop=True)
+
+    def _empty(self):
+        return pd.DataFrame(columns=['sensor_id', 'bucket'])
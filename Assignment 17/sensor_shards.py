@@ -0,0 +1,132 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Sensor-sharded version of the Task-3 fill and smoothing steps. Every step
+# before scaling is independent per sensor, so readings are split into shards
+# by a hash of sensor_id and each shard runs the same groupby ffill / bfill /
+# centered rolling mean in a worker process. Scaling needs global statistics;
+# each shard returns its (count, mean, M2) per field and those are merged
+# (Chan et al.) instead of refitting a scaler over the combined frame.
+
+FIELDS = ['temperature', 'humidity']
+
+# Frame being processed in this process; workers receive it through the pool
+# initializer (inherited without copying under fork, pickled once per worker
+# otherwise), so only row positions and results cross process boundaries
+_FRAME = None
+
+
+def _init_worker(frame):
+    global _FRAME
+    _FRAME = frame
+
+
+def smooth_sensors(df, window, fields=FIELDS):
+    """
+    Forward fill, backward fill and centered rolling mean per sensor. Sensors
+    with no value at all stay NaN (the caller fills them with the global mean).
+    """
+    out = {}
+    for field in fields:
+        filled = df.groupby('sensor_id', observed=True)[field].ffill()
+        filled = filled.groupby(df['sensor_id'], observed=True).bfill()
+        out[f'{field}_filled'] = filled
+        # Same values as transform(lambda x: x.rolling(...).mean()), without
+        # a Python call per sensor
+        rolling = filled.groupby(df['sensor_id'], observed=True).rolling(
+            window=window, min_periods=1, center=True).mean()
+        out[field] = rolling.droplevel(0).reindex(df.index)
+    return pd.DataFrame(out, index=df.index)
+
+
+def moments(values):
+    """(count, mean, M2) of each column of a 2-D array, ignoring NaN."""
+    count = (~np.isnan(values)).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nansum(values, axis=0) / count
+    m2 = np.nansum((values - mean) ** 2, axis=0)
+    return count, np.nan_to_num(mean), m2
+
+
+def merge_moments(a, b):
+    """Chan's parallel merge of two (count, mean, M2) triples."""
+    count_a, mean_a, m2_a = a
+    count_b, mean_b, m2_b = b
+    count = count_a + count_b
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = mean_b - mean_a
+        mean = np.where(count > 0, mean_a + delta * count_b / count, 0.0)
+        m2 = m2_a + m2_b + np.where(count > 0, delta ** 2 * count_a * count_b / count, 0.0)
+    return count, mean, m2
+
+
+def _process_shard(task):
+    rows, window, fields = task
+    smoothed = smooth_sensors(_FRAME.iloc[rows], window, fields)
+    filled = smoothed[[f'{field}_filled' for field in fields]].to_numpy(dtype=float)
+    values = smoothed[fields].to_numpy(dtype=float)
+    return rows, values, moments(filled), moments(values)
+
+
+def preprocess_sharded(df, window, workers, shards=None, fields=FIELDS):
+    """
+    Fill, smooth and standard-scale the sensor fields of df (sorted by time)
+    using `shards` sensor-hash shards (4 per worker by default) processed in
+    a pool of `workers` processes. Returns the frame with the scaled fields,
+    the smoothed values before scaling, and {field: (mean, std)} of the
+    scaling.
+
+    The pool uses fork where the platform supports it. Elsewhere the calling
+    script must guard its top-level code with if __name__ == '__main__'.
+    """
+    shards = shards or workers * 4
+    local, sensors = pd.factorize(df['sensor_id'])
+    sensor_shard = pd.util.hash_array(np.asarray(sensors, dtype=object)) % shards
+    row_shard = sensor_shard[local]
+    tasks = [(np.flatnonzero(row_shard == shard), window, fields) for shard in range(shards)]
+    tasks = [task for task in tasks if len(task[0])]
+
+    if workers > 1:
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+        else:
+            context = multiprocessing.get_context()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(df,)) as pool:
+            results = list(pool.map(_process_shard, tasks))
+    else:
+        _init_worker(df)
+        try:
+            results = [_process_shard(task) for task in tasks]
+        finally:
+            _init_worker(None)
+
+    smoothed = np.empty((len(df), len(fields)))
+    filled_moments = smoothed_moments = (np.zeros(len(fields)), np.zeros(len(fields)),
+                                         np.zeros(len(fields)))
+    for rows, values, filled_part, smoothed_part in results:
+        smoothed[rows] = values
+        filled_moments = merge_moments(filled_moments, filled_part)
+        smoothed_moments = merge_moments(smoothed_moments, smoothed_part)
+
+    # Sensors with no readings at all take the overall mean of the filled
+    # values; their smoothed values are that constant too
+    fill_values = filled_moments[1]
+    missing = np.isnan(smoothed)
+    if missing.any():
+        smoothed = np.where(missing, fill_values, smoothed)
+        smoothed_moments = merge_moments(smoothed_moments,
+                                         (missing.sum(axis=0), fill_values, np.zeros(len(fields))))
+
+    count, mean, m2 = smoothed_moments
+    std = np.sqrt(m2 / count)
+    # As StandardScaler, a zero spread scales by 1
+    scale = np.where(std > 0, std, 1.0)
+    df = df.copy()
+    for f, field in enumerate(fields):
+        df[field] = (smoothed[:, f] - mean[f]) / scale[f]
+    smoothed = pd.DataFrame(smoothed, columns=fields, index=df.index)
+    return df, smoothed, {field: (mean[f], scale[f]) for f, field in enumerate(fields)}
@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Category encodings that scale to many distinct values. The integer codes
+# are derived once and reused for both the label encoding and the one-hot
+# matrix, which is built sparse (one stored entry per row) instead of as one
+# dense boolean column per category.
+
+
+def category_codes(values):
+    """
+    Integer codes and the sorted categories of values - the same mapping as
+    LabelEncoder. A categorical column reuses its existing codes.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        if not values.cat.categories.is_monotonic_increasing:
+            values = values.cat.reorder_categories(values.cat.categories.sort_values())
+        codes, categories = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, categories = pd.factorize(values, sort=True)
+    if (codes < 0).any():
+        raise ValueError("Cannot encode missing values")
+    dtype = np.int32 if len(categories) > np.iinfo(np.int16).max else np.int16
+    return codes.astype(dtype), pd.Index(categories)
+
+
+def onehot_matrix(codes, n_categories, dtype=np.int8):
+    """Sparse CSR one-hot matrix with one row per code."""
+    rows = np.arange(len(codes))
+    return sparse.csr_matrix((np.ones(len(codes), dtype=dtype), (rows, codes)),
+                             shape=(len(codes), n_categories))
+
+
+def onehot_frame(codes, categories, prefix):
+    """Dense boolean one-hot columns, as pd.get_dummies(prefix=prefix) makes them."""
+    columns = [f'{prefix}_{category}' for category in categories]
+    dense = codes[:, None] == np.arange(len(categories))
+    return pd.DataFrame(dense, columns=columns)
+
+
+def _labels_path(path, kind):
+    return os.path.splitext(path)[0] + f'_{kind}.txt'
+
+
+def save_sparse(path, matrix, labels, row_labels=None):
+    """
+    Save a sparse matrix to path (.npz) and its column labels, one per line,
+    next to it as <name>_columns.txt (skipped when labels is None); row_labels
+    (ids of the rows, if given) go to <name>_rows.txt. Returns the column
+    labels path.
+    """
+    sparse.save_npz(path, matrix.tocsr())
+    labels_path = _labels_path(path, 'columns')
+    if labels is not None:
+        with open(labels_path, 'w', encoding='utf-8') as f:
+            f.writelines(f'{label}\n' for label in labels)
+    if row_labels is not None:
+        with open(_labels_path(path, 'rows'), 'w', encoding='utf-8') as f:
+            f.writelines(f'{label}\n' for label in row_labels)
+    return labels_path
+
+
+def load_sparse(path):
+    """
+    Load a matrix saved by save_sparse: (CSR matrix, column labels, row
+    labels), with None for labels that were not saved.
+    """
+    matrix = sparse.load_npz(path).tocsr()
+    labels = row_labels = None
+    if os.path.exists(_labels_path(path, 'columns')):
+        with open(_labels_path(path, 'columns'), encoding='utf-8') as f:
+            labels = [line.rstrip('\n') for line in f]
+    if os.path.exists(_labels_path(path, 'rows')):
+        with open(_labels_path(path, 'rows'), encoding='utf-8') as f:
+            row_labels = [line.rstrip('\n') for line in f]
+    return matrix, labels, row_labels
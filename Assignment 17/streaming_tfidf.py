@@ -0,0 +1,84 @@
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+# Out-of-core TF-IDF for review sets larger than memory. Terms are hashed
+# into a fixed number of columns, so there is no vocabulary to hold; the
+# only state is one document-frequency counter per column. A first pass over
+# the corpus accumulates document frequencies chunk by chunk (partial_fit),
+# and a second pass transforms chunks with the resulting IDF weights. Memory
+# is bounded by n_features and the chunk size, whatever the corpus size.
+#
+# Weights follow TfidfVectorizer (raw counts, smoothed IDF, L2 rows), so on a
+# corpus without hash collisions every row holds the same values as the
+# in-memory vectorizer without max_features, only in different columns.
+
+
+class StreamingTfidf:
+    """
+    Hashed TF-IDF fitted over chunks. min_df / max_df drop columns by
+    document frequency as in TfidfVectorizer (a float is a share of the
+    documents, an int a count); max_features has no hashed equivalent.
+    """
+
+    def __init__(self, n_features=2 ** 20, ngram_range=(1, 1), stop_words=None,
+                 min_df=1, max_df=1.0, sublinear_tf=False):
+        self.hasher = HashingVectorizer(n_features=n_features, ngram_range=ngram_range,
+                                        stop_words=stop_words, alternate_sign=False, norm=None)
+        self.n_features = n_features
+        self.min_df = min_df
+        self.max_df = max_df
+        self.sublinear_tf = sublinear_tf
+        self.n_documents = 0
+        self.document_frequency = np.zeros(n_features, dtype=np.int64)
+        self._idf = None
+
+    def partial_fit(self, texts):
+        """Count the documents each column occurs in for one chunk of texts."""
+        counts = self.hasher.transform(texts)
+        counts.sum_duplicates()
+        self.document_frequency += np.bincount(counts.indices, minlength=self.n_features)
+        self.n_documents += counts.shape[0]
+        self._idf = None
+        return self
+
+    @property
+    def idf(self):
+        """IDF weight of every column; 0 for dropped or unseen columns."""
+        if self._idf is None:
+            n = self.n_documents
+            idf = np.log((1 + n) / (1 + self.document_frequency)) + 1
+            min_count = self.min_df if isinstance(self.min_df, int) else self.min_df * n
+            max_count = self.max_df if isinstance(self.max_df, int) else self.max_df * n
+            keep = ((self.document_frequency > 0) & (self.document_frequency >= min_count)
+                    & (self.document_frequency <= max_count))
+            self._idf = np.where(keep, idf, 0.0)
+        return self._idf
+
+    def kept_features(self):
+        """Number of columns with a non-zero weight."""
+        return int(np.count_nonzero(self.idf))
+
+    def transform(self, texts):
+        """TF-IDF rows (CSR, L2-normalized) for one chunk of texts."""
+        counts = self.hasher.transform(texts)
+        counts.sum_duplicates()
+        if self.sublinear_tf:
+            np.log(counts.data, out=counts.data)
+            counts.data += 1
+        weighted = counts @ sparse.diags(self.idf)
+        weighted.eliminate_zeros()
+        return normalize(weighted.tocsr(), norm='l2', copy=False)
+
+    def term_columns(self, texts):
+        """{column: term} for the terms occurring in texts (for reporting)."""
+        analyzer = self.hasher.build_analyzer()
+        terms = sorted({term for text in texts for term in analyzer(text)})
+        if not terms:
+            return {}
+        # Same hashing as the vectorizer, one term per row
+        hasher = FeatureHasher(self.n_features, input_type='string', alternate_sign=False)
+        columns = hasher.transform([[term] for term in terms]).indices
+        return dict(zip(columns.tolist(), terms))
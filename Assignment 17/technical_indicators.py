@@ -0,0 +1,204 @@
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+# Technical indicators for Task-2, computed over contiguous NumPy arrays.
+# Rows must be in (ticker, date) order. One set of prefix sums (prices,
+# squared prices, log returns, squared log returns) is built once and every
+# rolling indicator is a difference of prefix-sum entries, so each window
+# costs O(n) however long it is. The prefix sums restart every few windows
+# around a local anchor value, which keeps the variance sums free of the
+# cancellation a single running sum suffers on long series. Windows never
+# cross a ticker boundary and, as with pandas rolling(window), stay NaN until
+# a ticker has `window` observations.
+
+DEFAULT_INDICATORS = {
+    'log_return': [1, 7],
+    'volatility': [7, 30],
+    'sma': [7, 30],
+    'ema': [12, 26],
+    'rsi': [14],
+    'zscore': [20],
+}
+
+
+def _positions(codes):
+    """Position of each row within its ticker."""
+    index = np.arange(len(codes))
+    new_group = np.r_[True, codes[1:] != codes[:-1]]
+    return index - np.maximum.accumulate(np.where(new_group, index, 0))
+
+
+def _block_sums(values, block):
+    """
+    Prefix sums of values and of their squares, restarted every `block` rows
+    and taken around each block's first value, so they stay small however
+    long the series is. Returns (anchors, sums, squares), the last two
+    shaped (blocks, block).
+    """
+    n_blocks = -(-len(values) // block)
+    padded = np.zeros(n_blocks * block)
+    padded[:len(values)] = values
+    anchors = padded[::block].copy()
+    centred = padded.reshape(n_blocks, block) - anchors[:, None]
+    return anchors, np.cumsum(centred, axis=1), np.cumsum(centred * centred, axis=1)
+
+
+def _window_moments(block_sums, window, position, min_position):
+    """
+    Sum and sum of squares of each row's trailing window, taken around the
+    anchor of the row's block (also returned). Windows are shorter than a
+    block, so the first window - 1 rows of a block reach back into the end
+    of the previous block, whose sums are shifted to the current anchor.
+    Rows with position < min_position are NaN.
+    """
+    anchors, sums, squares = block_sums
+    block = sums.shape[1]
+    window_sums = np.full(sums.shape, np.nan)
+    window_squares = np.full(sums.shape, np.nan)
+    window_sums[:, window - 1:] = sums[:, window - 1:]
+    window_squares[:, window - 1:] = squares[:, window - 1:]
+    window_sums[:, window:] -= sums[:, :-window]
+    window_squares[:, window:] -= squares[:, :-window]
+    if window > 1:
+        # Column j takes its last window - 1 - j rows from the previous block
+        count = np.arange(window - 1, 0, -1)
+        shift = (anchors[:-1] - anchors[1:])[:, None]
+        spill_sums = sums[:-1, -1:] - sums[:-1, block - window:block - 1]
+        spill_squares = squares[:-1, -1:] - squares[:-1, block - window:block - 1]
+        window_sums[1:, :window - 1] = sums[1:, :window - 1] + spill_sums + count * shift
+        window_squares[1:, :window - 1] = (squares[1:, :window - 1] + spill_squares
+                                           + 2 * shift * spill_sums + count * shift * shift)
+
+    n = len(position)
+    window_sums = window_sums.ravel()[:n]
+    window_squares = window_squares.ravel()[:n]
+    window_sums[position < min_position] = np.nan
+    window_squares[position < min_position] = np.nan
+    return window_sums, window_squares, np.repeat(anchors, block)[:n]
+
+
+def _window_std(sums, squares, window):
+    variance = (squares - sums * sums / window) / (window - 1)
+    return np.sqrt(np.maximum(variance, 0))
+
+
+def _ema(values, alpha, group_starts, position):
+    """
+    EMA (adjust=False, seeded with the first value) restarted per ticker.
+    One lfilter pass runs across all tickers; each ticker then differs from
+    its own seeded recursion only by what the pass carried in from the
+    ticker before, a term decaying as (1 - alpha) ** (position + 1), which
+    is removed in one vectorized step.
+
+    When tickers average 1,000 rows or more, one lfilter call per ticker is
+    cheaper (its ~10 us call overhead is then under 10 ns per row). NaN would
+    carry across tickers in a single pass, so inputs with NaN also take that
+    path.
+    """
+    decay = 1 - alpha
+    if len(values) >= 1000 * len(group_starts) or np.isnan(values).any():
+        out = np.empty(len(values))
+        bounds = np.r_[group_starts, len(values)]
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            segment = values[start:stop]
+            out[start:stop], _ = lfilter([alpha], [1, -decay], segment, zi=[decay * segment[0]])
+        return out
+    # Filter every ticker relative to its first value, so the carried-in term
+    # (and the rounding left once it is removed) is at the scale of the
+    # ticker itself rather than of a much pricier neighbour
+    lengths = np.diff(np.r_[group_starts, len(values)])
+    scale = np.abs(values[group_starts])
+    scale[scale == 0] = 1.0
+    scale = np.repeat(scale, lengths)
+    scaled = values / scale
+    out, _ = lfilter([alpha], [1, -decay], scaled, zi=[decay * scaled[0]])
+    # Each ticker's recursion starts from its first value; the pass started
+    # it from the previous ticker's last output instead. Past `reach` rows
+    # that carried-in term is below rounding.
+    offsets = np.r_[0.0, scaled[group_starts[1:]] - out[group_starts[1:] - 1]]
+    reach = np.log(np.finfo(float).eps) / np.log(decay) if decay > 0 else 0
+    counts = np.minimum(lengths, int(np.ceil(reach)))
+    steps = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    rows = np.repeat(group_starts, counts) + steps
+    out[rows] += np.repeat(offsets, counts) * decay ** (steps + 1)
+    out *= scale
+    return out
+
+
+def compute_indicators(df, indicators=None, by=None):
+    """
+    Add the requested indicators to df, computed from closing_price.
+
+    indicators maps a name to a list of windows (DEFAULT_INDICATORS when
+    None): log_return_{h} (log of the h-period price ratio), volatility_{w}
+    (rolling std of 1-period log returns), sma_{w}, ema_{w} (span w),
+    rsi_{w} and zscore_{w}.
+
+    rsi_{w} smooths gains and losses with Wilder's alpha = 1/w as an EMA
+    seeded at each ticker's first row (pandas ewm(alpha=1/w, adjust=False));
+    it is NaN for the first w rows, 100 when the average loss is 0 and 50
+    when nothing moved. zscore_{w} is the distance from sma_{w} in rolling
+    sample standard deviations, and 0 when the window is flat.
+    """
+    indicators = DEFAULT_INDICATORS if indicators is None else indicators
+    unknown = set(indicators) - set(DEFAULT_INDICATORS)
+    if unknown:
+        raise ValueError(f"Unknown indicators {sorted(unknown)}; "
+                         f"expected some of {sorted(DEFAULT_INDICATORS)}")
+    prices = df['closing_price'].to_numpy(dtype=float)
+    if len(prices) == 0:
+        return df
+    codes = pd.factorize(df[by])[0] if by else np.zeros(len(prices), dtype=np.int64)
+    position = _positions(codes)
+    group_starts = np.flatnonzero(position == 0)
+    features = {}
+
+    # Shared intermediates, each built once
+    log_prices = np.log(prices)
+    step_returns = np.r_[0.0, np.diff(log_prices)]
+    step_returns[position == 0] = 0.0
+    windows = [w for name in ('volatility', 'sma', 'zscore') for w in indicators.get(name, [])]
+    block = 4 * max(windows, default=1)
+    if 'volatility' in indicators:
+        return_sums = _block_sums(step_returns, block)
+    if {'sma', 'zscore'} & set(indicators):
+        price_sums = _block_sums(prices, block)
+
+    for h in indicators.get('log_return', []):
+        lagged = np.full(len(prices), np.nan)
+        if h < len(prices):
+            lagged[h:] = log_prices[:-h]
+        lagged[position < h] = np.nan
+        features[f'log_return_{h}'] = log_prices - lagged
+    for w in indicators.get('volatility', []):
+        sums, squares, _ = _window_moments(return_sums, w, position, w)
+        features[f'volatility_{w}'] = _window_std(sums, squares, w)
+    for w in indicators.get('sma', []):
+        sums, _, anchors = _window_moments(price_sums, w, position, w - 1)
+        features[f'sma_{w}'] = anchors + sums / w
+    for w in indicators.get('ema', []):
+        features[f'ema_{w}'] = _ema(prices, 2 / (w + 1), group_starts, position)
+    if 'rsi' in indicators:
+        changes = np.r_[0.0, np.diff(prices)]
+        changes[position == 0] = 0.0
+        gains, losses = np.maximum(changes, 0), np.maximum(-changes, 0)
+        for w in indicators['rsi']:
+            average_gain = _ema(gains, 1 / w, group_starts, position)
+            average_loss = _ema(losses, 1 / w, group_starts, position)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rsi = 100 - 100 / (1 + average_gain / average_loss)
+            rsi[average_loss == 0] = 100.0
+            rsi[(average_loss == 0) & (average_gain == 0)] = 50.0
+            rsi[position < w] = np.nan
+            features[f'rsi_{w}'] = rsi
+    for w in indicators.get('zscore', []):
+        sums, squares, anchors = _window_moments(price_sums, w, position, w - 1)
+        std = _window_std(sums, squares, w)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            zscore = np.where(std > 0, (prices - anchors - sums / w) / std, 0.0)
+        zscore[position < w - 1] = np.nan
+        features[f'zscore_{w}'] = zscore
+
+    # One concat instead of inserting columns one at a time
+    return pd.concat([df, pd.DataFrame(features, index=df.index)], axis=1)
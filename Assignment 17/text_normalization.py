@@ -0,0 +1,206 @@
+import os
+import re
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Text normalization shared by the social-media cleaner (Task-1) and the
+# movie-review standardizer (Task-4). Patterns are compiled once at import and
+# the stopword set is built once per process, and whole columns are processed
+# through pandas .str methods instead of one Python call per row. Passing
+# workers > 1 spreads a column over a process pool.
+
+# Remove HTML tags
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+
+# Remove URLs together with special characters and punctuation. The two steps
+# can share one pattern because a URL match always wins at its start position,
+# exactly as if URLs had been removed first.
+URL_AND_SYMBOL_PATTERN = re.compile(r'http\S+|www.\S+|[^a-zA-Z0-9\s]')
+
+# Collapse runs of whitespace
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Frozen copy of the NLTK English stopword list, so workers without network
+# access (or without NLTK data) start without touching NLTK at all
+STOP_WORDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               'english_stopwords.txt')
+
+
+@lru_cache(maxsize=None)
+def get_stop_words():
+    """
+    Return the English stopword set. It is read from STOP_WORDS_FILE; only if
+    that file is missing is NLTK imported (downloading its corpus if needed)
+    and the list written back to STOP_WORDS_FILE for the next run.
+    """
+    if os.path.exists(STOP_WORDS_FILE):
+        with open(STOP_WORDS_FILE, encoding='utf-8') as f:
+            return frozenset(line.strip() for line in f if line.strip())
+
+    import nltk
+    try:
+        nltk.data.find('corpora/stopwords')
+    except LookupError:
+        nltk.download('stopwords', quiet=True)
+    words = nltk.corpus.stopwords.words('english')
+    try:
+        with open(STOP_WORDS_FILE, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(words) + '\n')
+    except OSError:
+        pass
+    return frozenset(words)
+
+
+@lru_cache(maxsize=None)
+def get_stop_word_pattern():
+    """
+    Return one pattern matching any stopword or single-character token.
+    After symbol removal tokens are plain [a-z0-9] runs, so word boundaries
+    line up exactly with the whitespace split used by clean_text.
+    """
+    words = sorted(get_stop_words(), key=len, reverse=True)
+    alternatives = '|'.join(re.escape(word) for word in words)
+    return re.compile(r'\b(?:' + alternatives + r'|[a-z0-9])\b')
+
+
+def cleaning_fingerprint():
+    """
+    Return a short digest of the cleaning rules (patterns and stopwords).
+    Anything caching clean_text_series output can store it and discard
+    results produced under different rules.
+    """
+    digest = hashlib.sha1()
+    for pattern in (HTML_TAG_PATTERN, URL_AND_SYMBOL_PATTERN, WHITESPACE_PATTERN):
+        digest.update(pattern.pattern.encode('utf-8'))
+    digest.update('\n'.join(sorted(get_stop_words())).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def _as_text(texts):
+    """Turn missing values into empty strings and everything else into str."""
+    return texts.astype(object).where(texts.notna(), '').astype(str)
+
+
+def _lower(texts):
+    """
+    Lowercase a column exactly as str.lower does. Arrow-backed string columns
+    lowercase a few dozen non-ASCII characters differently (e.g. 'İ' and a
+    word-final 'Σ'), so rows that are not pure ASCII use str.lower itself.
+    """
+    lowered = texts.str.lower()
+    non_ascii = ~texts.str.isascii()
+    if non_ascii.any():
+        lowered = lowered.where(~non_ascii, texts[non_ascii].map(str.lower))
+    return lowered
+
+
+def _init_worker():
+    """Build the stopword set and pattern once in each worker process."""
+    get_stop_word_pattern()
+
+
+# Pool shared by every run_sharded call in this process, so a streaming run
+# starts its workers once instead of once per chunk
+_POOL = None
+_POOL_WORKERS = 0
+
+
+def get_pool(workers):
+    """
+    Return the shared pool of `workers` processes, starting it on first use
+    (or replacing it when a different size is asked for). Its workers exit
+    with the interpreter.
+
+    The pool uses fork where the platform supports it. Elsewhere the calling
+    script must guard its top-level code with if __name__ == '__main__'.
+    """
+    global _POOL, _POOL_WORKERS
+    if _POOL is None or _POOL_WORKERS != workers:
+        if _POOL is not None:
+            _POOL.shutdown()
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+        else:
+            context = multiprocessing.get_context()
+        _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                    initializer=_init_worker)
+        _POOL_WORKERS = workers
+    return _POOL
+
+
+def run_sharded(func, texts, workers, shards_per_worker=4):
+    """
+    Split texts into contiguous shards, run func on each shard in the shared
+    pool of worker processes and reassemble the results in the original row
+    order. Each worker is initialised once with the stopword pattern, so only
+    the shard text itself is sent between processes.
+    """
+    n_shards = min(len(texts), workers * shards_per_worker)
+    bounds = np.linspace(0, len(texts), n_shards + 1).astype(int)
+    shards = [texts.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+    return pd.concat(get_pool(workers).map(func, shards))
+
+
+def clean_text_series(texts, workers=1):
+    """
+    Clean a column of post texts by removing HTML tags, URLs, special symbols,
+    punctuation, stopwords and one-character words.
+    Produces the same strings as clean_text applied row by row.
+    """
+    if workers > 1 and len(texts) > 1:
+        return run_sharded(clean_text_series, texts, workers)
+
+    texts = _as_text(texts)
+    texts = texts.str.replace(HTML_TAG_PATTERN, '', regex=True)
+    texts = texts.str.replace(URL_AND_SYMBOL_PATTERN, '', regex=True)
+    texts = _lower(texts)
+    texts = texts.str.replace(get_stop_word_pattern(), '', regex=True)
+    texts = texts.str.replace(WHITESPACE_PATTERN, ' ', regex=True).str.strip()
+    return texts
+
+
+def standardize_text_series(texts, workers=1):
+    """
+    Standardize a column of texts by removing HTML tags, converting to
+    lowercase and normalizing whitespace.
+    Produces the same strings as standardize_text applied row by row.
+    """
+    if workers > 1 and len(texts) > 1:
+        return run_sharded(standardize_text_series, texts, workers)
+
+    texts = _as_text(texts)
+    texts = texts.str.replace(HTML_TAG_PATTERN, '', regex=True)
+    texts = _lower(texts)
+    texts = texts.str.replace(WHITESPACE_PATTERN, ' ', regex=True).str.strip()
+    return texts
+
+
+def clean_text(text):
+    """
+    Clean a single text by removing HTML tags, special symbols, punctuation,
+    and stopwords.
+    """
+    if pd.isna(text):
+        return ""
+
+    text = HTML_TAG_PATTERN.sub('', str(text))
+    text = URL_AND_SYMBOL_PATTERN.sub('', text).lower()
+    stop_words = get_stop_words()
+    words = text.split()
+    return ' '.join(word for word in words if word not in stop_words and len(word) > 1)
+
+
+def standardize_text(text):
+    """
+    Standardize a single text: lowercase, no HTML tags, single spaces.
+    """
+    if pd.isna(text):
+        return ""
+
+    text = HTML_TAG_PATTERN.sub('', str(text)).lower()
+    return WHITESPACE_PATTERN.sub(' ', text).strip()
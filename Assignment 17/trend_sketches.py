@@ -0,0 +1,88 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+# Bounded-memory trending hashtags and terms for the social-media cleaner.
+# Each (dimension, bucket, kind) - e.g. hour 18 hashtags, or Friday terms -
+# keeps a Misra-Gries heavy-hitter summary (the counter-based algorithm behind
+# Space-Saving) with a fixed number of counters, fed chunk by chunk.
+
+HASHTAG_PATTERN = r'#(\w+)'
+
+
+class HeavyHitters:
+    """
+    Misra-Gries summary with at most `capacity` counters.
+
+    Each reported count is a lower bound; the true count is at most
+    `error` higher. Any item whose true count exceeds total / (capacity + 1)
+    is guaranteed to be present. Summaries of separate chunks can be merged
+    with update(other.counts).
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = {}
+        self.error = 0
+
+    def update(self, counts):
+        """Add a mapping of item -> count, then shrink back to capacity."""
+        merged = Counter(self.counts)
+        merged.update(counts)
+        if len(merged) > self.capacity:
+            values = np.fromiter(merged.values(), dtype=np.int64, count=len(merged))
+            # Subtract the (capacity + 1)-th largest count from every counter
+            cut = int(np.partition(values, len(values) - self.capacity - 1)[len(values) - self.capacity - 1])
+            self.error += cut
+            merged = {item: count - cut for item, count in merged.items() if count > cut}
+        self.counts = dict(merged)
+
+    def top(self, n):
+        """Return the n items with the highest counts."""
+        return Counter(self.counts).most_common(n)
+
+
+class TrendTracker:
+    """
+    Heavy-hitter hashtags and cleaned-text terms per hour of day and per
+    weekday. Memory is bounded by 2 * (24 + 7) summaries of `capacity`
+    counters each, independent of vocabulary size.
+    """
+
+    def __init__(self, capacity=500):
+        self.capacity = capacity
+        self.sketches = {}
+
+    def _sketch(self, key):
+        if key not in self.sketches:
+            self.sketches[key] = HeavyHitters(self.capacity)
+        return self.sketches[key]
+
+    def update(self, df):
+        """
+        Count hashtags from post_text and terms from cleaned_text for a
+        chunk of posts that already has hour and weekday columns.
+        """
+        items = {
+            'hashtag': df['post_text'].fillna('').astype(str).str.lower().str.findall(HASHTAG_PATTERN),
+            'term': df['cleaned_text'].fillna('').astype(str).str.split(),
+        }
+        for kind, lists in items.items():
+            exploded = df[['hour', 'weekday']].assign(item=lists).explode('item').dropna()
+            for dimension in ['hour', 'weekday']:
+                counts = exploded.groupby([dimension, 'item']).size()
+                for bucket, bucket_counts in counts.groupby(level=0):
+                    self._sketch((dimension, bucket, kind)).update(
+                        bucket_counts.droplevel(0).to_dict())
+
+    def report(self, top_n=10):
+        """Return the top_n items per bucket as one compact table."""
+        rows = []
+        for key in sorted(self.sketches):
+            dimension, bucket, kind = key
+            sketch = self.sketches[key]
+            for rank, (item, count) in enumerate(sketch.top(top_n), start=1):
+                rows.append((dimension, bucket, kind, rank, item, count, sketch.error))
+        return pd.DataFrame(rows, columns=['dimension', 'bucket', 'kind', 'rank',
+                                           'item', 'count', 'max_error'])